@@ -10,7 +10,9 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 import json
+import functools
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any, Optional, Callable
 
 # Define our own simple component decorator instead of importing from langflow
@@ -22,14 +24,31 @@ def component(cls):
 class MCPAIComponent:
     """Component for interacting with MCP-compliant AI services"""
     
-    def __init__(self, mcp_server_url: str = "http://localhost:8000"):
+    def __init__(self, mcp_server_url: str = "http://localhost:8000", session: Optional[requests.Session] = None):
         self.mcp_server_url = mcp_server_url
-        self.available_models = self._fetch_available_models()
-        
+        # All requests go through one session so keep-alive connections are reused
+        self.session = session or self._create_session()
+    
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Create an HTTP session with a connection pool for the MCP server"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+        
+    @functools.cached_property
+    def available_models(self) -> List[Dict[str, Any]]:
+        """Models offered by the MCP server, fetched once on first use"""
+        return self._fetch_available_models()
+    
     def _fetch_available_models(self) -> List[Dict[str, Any]]:
         """Fetch available models from the MCP server"""
         try:
-            response = requests.get(f"{self.mcp_server_url}/v1/models")
+            # Connect timeout is short so an unreachable host fails fast instead
+            # of blocking callers such as analyze_filesystem indefinitely
+            response = self.session.get(f"{self.mcp_server_url}/v1/models", timeout=(1, 10))
             response.raise_for_status()
             return response.json().get("models", [])
         except Exception as e:
@@ -52,7 +71,7 @@ class MCPAIComponent:
             "temperature": temperature
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/{model_id}/completion",
             json=payload
         )
@@ -71,7 +90,7 @@ class MCPAIComponent:
             "temperature": temperature
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/{model_id}/chat",
             json=payload
         )
@@ -93,7 +112,7 @@ class MCPAIComponent:
         
         try:
             # Try the v1 API endpoint first (correct path)
-            response = requests.post(
+            response = self.session.post(
                 f"{self.mcp_server_url}/v1/git/analyze",
                 json=payload,
                 timeout=30
@@ -104,7 +123,7 @@ class MCPAIComponent:
             if e.response.status_code == 404:
                 # Fallback to the git-analyzer model endpoint 
                 try:
-                    fallback_response = requests.post(
+                    fallback_response = self.session.post(
                         f"{self.mcp_server_url}/v1/models/git-analyzer/analyze",
                         json=payload,
                         timeout=30
@@ -136,7 +155,7 @@ class MCPAIComponent:
             "pattern": pattern
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/git-analyzer/search",
             json=payload
         )
@@ -156,7 +175,7 @@ class MCPAIComponent:
             "repo_url": repo_url
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/git-analyzer/diff",
             json=payload
         )
@@ -176,7 +195,7 @@ class MCPAIComponent:
             "path": path
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/list",
             json=payload
         )
@@ -196,7 +215,7 @@ class MCPAIComponent:
             "path": path
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/read",
             json=payload
         )
@@ -216,7 +235,7 @@ class MCPAIComponent:
             "paths": paths
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/read-multiple",
             json=payload
         )
@@ -238,7 +257,7 @@ class MCPAIComponent:
             "content": content
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/write",
             json=payload
         )
@@ -262,7 +281,7 @@ class MCPAIComponent:
             "dry_run": dry_run
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/edit",
             json=payload
         )
@@ -282,7 +301,7 @@ class MCPAIComponent:
             "path": path
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/mkdir",
             json=payload
         )
@@ -304,7 +323,7 @@ class MCPAIComponent:
             "destination": destination
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/move",
             json=payload
         )
@@ -330,7 +349,7 @@ class MCPAIComponent:
         if exclude_patterns:
             payload["exclude_patterns"] = exclude_patterns
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/search",
             json=payload
         )
@@ -350,7 +369,7 @@ class MCPAIComponent:
             "path": path
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/filesystem/info",
             json=payload
         )
@@ -375,7 +394,7 @@ class MCPAIComponent:
         if time:
             payload["time"] = time
             
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/prometheus/query",
             json=payload
         )
@@ -401,7 +420,7 @@ class MCPAIComponent:
             "step": step
         }
             
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/prometheus/query_range",
             json=payload
         )
@@ -433,7 +452,7 @@ class MCPAIComponent:
         if end:
             payload["end"] = end
             
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/prometheus/series",
             json=payload
         )
@@ -446,7 +465,7 @@ class MCPAIComponent:
         Returns:
             Dict[str, Any]: Label names
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.mcp_server_url}/v1/models/prometheus/labels"
         )
         response.raise_for_status()
@@ -465,7 +484,7 @@ class MCPAIComponent:
             "label_name": label_name
         }
         
-        response = requests.post(
+        response = self.session.post(
             f"{self.mcp_server_url}/v1/models/prometheus/label_values",
             json=payload
         )
@@ -478,7 +497,7 @@ class MCPAIComponent:
         Returns:
             Dict[str, Any]: Targets information
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.mcp_server_url}/v1/models/prometheus/targets"
         )
         response.raise_for_status()
@@ -490,7 +509,7 @@ class MCPAIComponent:
         Returns:
             Dict[str, Any]: Rules information
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.mcp_server_url}/v1/models/prometheus/rules"
         )
         response.raise_for_status()
@@ -502,7 +521,7 @@ class MCPAIComponent:
         Returns:
             Dict[str, Any]: Alerts information
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.mcp_server_url}/v1/models/prometheus/alerts"
         )
         response.raise_for_status()
@@ -526,7 +545,7 @@ class MCPAIComponent:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.mcp_server_url}/v1/git/analyze_diff",
                 json=payload,
                 timeout=30
@@ -537,7 +556,7 @@ class MCPAIComponent:
             if e.response.status_code == 404:
                 # Fallback to the git-analyzer endpoint if the dedicated endpoint doesn't exist
                 try:
-                    fallback_response = requests.post(
+                    fallback_response = self.session.post(
                         f"{self.mcp_server_url}/v1/models/git-diff-analyzer/analyze",
                         json=payload,
                         timeout=30
@@ -573,7 +592,7 @@ class MCPAIComponent:
         
         try:
             # Try the v1 API endpoint first
-            response = requests.post(
+            response = self.session.post(
                 f"{self.mcp_server_url}/v1/git/analyze_requirements",
                 json=payload,
                 timeout=30
@@ -584,7 +603,7 @@ class MCPAIComponent:
             if e.response.status_code == 404:
                 # Fallback to the git-diff-analyzer endpoint if the dedicated endpoint doesn't exist
                 try:
-                    fallback_response = requests.post(
+                    fallback_response = self.session.post(
                         f"{self.mcp_server_url}/v1/models/git-diff-analyzer/analyze-requirements",
                         json=payload,
                         timeout=30
@@ -619,7 +638,7 @@ class MCPAIComponent:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.mcp_server_url}/v1/git/analyze_comprehensive",
                 json=payload,
                 timeout=60  # Longer timeout as this combines multiple analyses
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Small helpers shared by the Git test scripts: repository URL normalization,
+environment settings, JSON output, a pooled HTTP session and on-disk cache files.
+"""
+
+import os
+import re
+import json
+import atexit
+import shutil
+import tempfile
+import functools
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # Use orjson when available to format large analysis results
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
+# "git@host:owner/repo" and "ssh://git@host/owner/repo" style URLs
+SCP_URL_PATTERN = re.compile(r'^(?:[\w.-]+@)?([\w.-]+):(?!//)(.+)$')
+URL_PATTERN = re.compile(r'^(?:(?:git\+)?ssh|git|https?)://(?:[^@/]+@)?([^/]+)/(.+)$')
+
+def normalize_repo_url(repo_url: str) -> str:
+    """
+    Normalize a repository URL so that equivalent forms share cache entries.
+    
+    'git@github.com:x/y', 'https://github.com/x/y' and 'https://GitHub.com/x/y.git'
+    all normalize to 'https://github.com/x/y'. Other URLs, such as local paths,
+    are returned unchanged apart from a trailing slash or '.git'.
+    """
+    url = repo_url.strip().rstrip("/")
+    match = URL_PATTERN.match(url) or SCP_URL_PATTERN.match(url)
+    if match:
+        url = f"https://{match.group(1).lower()}/{match.group(2)}"
+    if url.endswith(".git"):
+        url = url[:-4]
+    return url
+
+def get_env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, using the default if it is unset or malformed"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Warning: Ignoring invalid {name}={value!r}; using {default}")
+        return default
+
+def format_json(value: Any) -> str:
+    """Format a value as indented JSON, using orjson if it is installed"""
+    if HAVE_ORJSON:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            # orjson rejects some values json accepts, such as non-string keys
+            pass
+    return json.dumps(value, indent=2)
+
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Get a shared HTTP session with a connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def write_file_atomic(path: str, data: bytes):
+    """Write a file through a temporary file and rename, so readers never see a partial one"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def make_temporary_cache_dir(prefix: str) -> str:
+    """Create a throwaway cache directory that is removed when the process exits"""
+    cache_dir = tempfile.mkdtemp(prefix=prefix)
+    atexit.register(shutil.rmtree, cache_dir, True)
+    return cache_dir
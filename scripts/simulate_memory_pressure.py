@@ -15,6 +15,8 @@ Usage:
 
 import os
 import sys
+import math
+import mmap
 import time
 import psutil
 import argparse
@@ -65,15 +67,24 @@ def allocate_memory(target_percent, duration_seconds):
     
     # Allocate memory in chunks to avoid sudden large allocations
     chunk_size = 10 * 1024 * 1024  # 10 MB chunks
-    num_chunks = int(bytes_to_allocate / chunk_size) + 1
+    target_chunks = math.ceil(bytes_to_allocate / chunk_size)
     
-    memory_blocks = []
+    memory_buffer = None
     allocated_mb = 0
     
     print("\nAllocating memory...")
     try:
-        for i in range(num_chunks):
-            if i % 5 == 0:  # Update progress every 5 chunks (50 MB)
+        # Reserve a single anonymous mapping of whole chunks up front (at least
+        # one, so it is never empty); its pages are only committed as each
+        # chunk is written below
+        memory_buffer = mmap.mmap(-1, target_chunks * chunk_size)
+        fill = memoryview(b"\x01" * chunk_size)
+        
+        for i in range(target_chunks):
+            # The chunk count already covers the target, so memory usage is
+            # only sampled as a safety check every 10 chunks (100 MB) and
+            # before the last one
+            if i % 10 == 0 or i == target_chunks - 1:
                 mem_info = get_memory_info()
                 print(f"Current memory usage: {mem_info['percent']}% (allocated {allocated_mb:.2f} MB so far)")
                 
@@ -81,9 +92,11 @@ def allocate_memory(target_percent, duration_seconds):
                     print(f"Reached target memory usage of {target_percent}%")
                     break
             
-            # Allocate a chunk of memory
-            memory_blocks.append(bytearray(chunk_size))
-            allocated_mb += chunk_size / (1024 * 1024)
+            # Touch the next chunk of the buffer to force it into memory
+            offset = i * chunk_size
+            end = min(offset + chunk_size, len(memory_buffer))
+            memory_buffer[offset:end] = fill[:end - offset]
+            allocated_mb += (end - offset) / (1024 * 1024)
             
             # Small pause to give system time to update metrics
             time.sleep(0.1)
@@ -99,12 +112,16 @@ def allocate_memory(target_percent, duration_seconds):
         
     except MemoryError:
         print("Memory allocation failed - system is out of memory")
+    except OSError as e:
+        # A failed anonymous mmap raises OSError (ENOMEM) rather than MemoryError
+        print(f"Memory allocation failed - could not map memory: {e}")
     except KeyboardInterrupt:
         print("\nMemory allocation interrupted by user")
     finally:
         # Clean up by releasing memory
         print("\nReleasing allocated memory...")
-        memory_blocks.clear()
+        if memory_buffer is not None:
+            memory_buffer.close()
         
         # Force garbage collection
         import gc
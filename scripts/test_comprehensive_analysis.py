@@ -4,6 +4,11 @@ import sys
 import json
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+
+# Shared session so repeated analyses reuse pooled keep-alive connections
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=1))
 
 def test_comprehensive_analysis(repo_url, commit_sha, target_commit='HEAD'):
     """Test the comprehensive analysis endpoint
@@ -25,7 +30,7 @@ def test_comprehensive_analysis(repo_url, commit_sha, target_commit='HEAD'):
     
     # Call the API endpoint directly
     try:
-        response = requests.post(
+        response = _session.post(
             "http://localhost:8000/v1/git/analyze_comprehensive",
             json=payload,
             timeout=60
@@ -9,23 +9,61 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 import json
+import time
 import tempfile
+from collections import Counter
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 from langflow import MCPAIComponent
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 import mimetypes
 
-def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> Dict[str, Any]:
+try:
+    # Use orjson when available to serialize large analysis results
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
+def _dumps_bytes(data: Any) -> bytes:
+    """Serialize data to JSON bytes, using orjson if it is installed"""
+    if HAVE_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+# MCP clients and their chat models, keyed by server URL
+_chat_model_cache: Dict[str, Tuple[MCPAIComponent, List[Dict[str, Any]]]] = {}
+
+def _get_chat_models(mcp_server_url: str) -> Tuple[MCPAIComponent, List[Dict[str, Any]]]:
+    """
+    Return an MCP client and its available chat models, fetching them once per process.
+    
+    Only servers that offered chat models are cached, so an unreachable server
+    is retried on the next call.
+    """
+    if mcp_server_url in _chat_model_cache:
+        return _chat_model_cache[mcp_server_url]
+    
+    mcp = MCPAIComponent(mcp_server_url=mcp_server_url)
+    chat_models = [model for model in mcp.list_models() if model.get('id', '').endswith('-chat')]
+    if chat_models:
+        _chat_model_cache[mcp_server_url] = (mcp, chat_models)
+    return mcp, chat_models
+
+def analyze_filesystem(base_path: str = None, capture_output: bool = False,
+                       return_json: bool = False) -> Union[Dict[str, Any], bytes]:
     """
     Analyze the filesystem structure and provide statistics about file types, sizes, etc.
     
     Args:
         base_path (str): The base path to analyze. Defaults to the current directory.
         capture_output (bool): If True, return results without printing. If False, print results.
+        return_json (bool): If True, return the analysis serialized as JSON bytes instead of a dict.
         
     Returns:
-        Dict[str, Any]: A dictionary containing filesystem analysis data
+        Union[Dict[str, Any], bytes]: A dictionary containing filesystem analysis data,
+        or its JSON encoding if return_json is True
     """
     if base_path is None:
         base_path = os.getcwd()
@@ -36,7 +74,7 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
         "base_path": base_path,
         "files": [],
         "directories": [],
-        "file_types": {},
+        "file_types": Counter(),
         "total_size_bytes": 0,
         "largest_files": []
     }
@@ -51,78 +89,98 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
     
     log_info(f"=== Analyzing Filesystem at {base_path} ===")
     
-    # Walk the directory tree
-    for root, dirs, files in os.walk(base_path):
-        # Add directories to the result
-        rel_root = os.path.relpath(root, base_path)
-        if rel_root != ".":
-            result["directories"].append(rel_root)
+    # Every path produced by the walk starts with base_path, so relative paths
+    # are sliced off that prefix instead of recomputed with os.path.relpath
+    base_len = len(os.path.join(base_path, ""))
+    
+    # Walk the directory tree with os.scandir so entry types and stats come
+    # from the directory listing; access errors are handled per directory
+    pending_dirs = [base_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        subdirs = []
         
-        # Process each file
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, base_path)
-            
-            try:
-                # Get file stats
-                file_stats = os.stat(file_path)
-                size_bytes = file_stats.st_size
-                result["total_size_bytes"] += size_bytes
-                
-                # Get file extension and mime type
-                _, ext = os.path.splitext(file)
-                ext = ext.lower()
-                if ext:
-                    # Remove the dot from extension
-                    ext = ext[1:]
-                else:
-                    ext = "no extension"
+        try:
+            with os.scandir(current_dir) as entries:
+                # Add directories to the result
+                rel_root = current_dir[base_len:]
+                if rel_root:
+                    result["directories"].append(rel_root)
                 
-                mime_type, _ = mimetypes.guess_type(file_path)
-                if not mime_type:
-                    mime_type = "application/octet-stream"
-                
-                # Update file type counts
-                if ext in result["file_types"]:
+                # Process each file
+                for entry in entries:
+                    if entry.is_dir():
+                        # Like os.walk, don't descend into symlinked directories
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    
+                    file_path = entry.path
+                    rel_path = file_path[base_len:]
+                    
+                    # Get file stats
+                    try:
+                        file_stats = entry.stat()
+                    except (PermissionError, FileNotFoundError) as e:
+                        # Skip files we can't access
+                        if not capture_output:
+                            print(f"Warning: Could not access {file_path}: {str(e)}")
+                        continue
+                    size_bytes = file_stats.st_size
+                    result["total_size_bytes"] += size_bytes
+                    
+                    # Get file extension and mime type
+                    _, ext = os.path.splitext(entry.name)
+                    ext = ext.lower()
+                    if ext:
+                        # Remove the dot from extension
+                        ext = ext[1:]
+                    else:
+                        ext = "no extension"
+                    
+                    mime_type, _ = mimetypes.guess_type(file_path)
+                    if not mime_type:
+                        mime_type = "application/octet-stream"
+                    
+                    # Update file type counts
                     result["file_types"][ext] += 1
-                else:
-                    result["file_types"][ext] = 1
-                
-                # Create file info
-                file_info = {
-                    "path": rel_path,
-                    "size_bytes": size_bytes,
-                    "modified": datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
-                    "extension": ext,
-                    "mime_type": mime_type
-                }
-                
-                # Add to files list
-                result["files"].append(file_info)
-                
-                # Check if it's one of the largest files
-                if len(result["largest_files"]) < 10:
-                    # Add the file to the list and sort by size
-                    result["largest_files"].append(file_info)
-                    result["largest_files"] = sorted(
-                        result["largest_files"], 
-                        key=lambda x: x["size_bytes"], 
-                        reverse=True
-                    )
-                elif size_bytes > result["largest_files"][-1]["size_bytes"]:
-                    # Replace the smallest file in the largest files list
-                    result["largest_files"][-1] = file_info
-                    result["largest_files"] = sorted(
-                        result["largest_files"], 
-                        key=lambda x: x["size_bytes"], 
-                        reverse=True
-                    )
-                
-            except (PermissionError, FileNotFoundError) as e:
-                # Skip files we can't access
-                if not capture_output:
-                    print(f"Warning: Could not access {file_path}: {str(e)}")
-                continue
+                    
+                    # Create file info
+                    file_info = {
+                        "path": rel_path,
+                        "size_bytes": size_bytes,
+                        "modified": datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
+                        "extension": ext,
+                        "mime_type": mime_type
+                    }
+                    
+                    # Add to files list
+                    result["files"].append(file_info)
+                    
+                    # Check if it's one of the largest files
+                    if len(result["largest_files"]) < 10:
+                        # Add the file to the list and sort by size
+                        result["largest_files"].append(file_info)
+                        result["largest_files"] = sorted(
+                            result["largest_files"], 
+                            key=lambda x: x["size_bytes"], 
+                            reverse=True
+                        )
+                    elif size_bytes > result["largest_files"][-1]["size_bytes"]:
+                        # Replace the smallest file in the largest files list
+                        result["largest_files"][-1] = file_info
+                        result["largest_files"] = sorted(
+                            result["largest_files"], 
+                            key=lambda x: x["size_bytes"], 
+                            reverse=True
+                        )
+        except OSError as e:
+            # Skip directories we can't access
+            if not capture_output:
+                print(f"Warning: Could not access {current_dir}: {str(e)}")
+        
+        # Visit subdirectories in listing order, as os.walk does
+        pending_dirs.extend(reversed(subdirs))
     
     # Calculate additional statistics
     result["total_files"] = len(result["files"])
@@ -137,13 +195,13 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
     )
     result["summary"] = summary
     
+    # Rank file types and largest files once for both the AI prompt and the printed summary
+    top_file_types = result['file_types'].most_common(10)
+    top_largest_files = result['largest_files'][:5]
+    
     # Try to get AI analysis of the filesystem
     try:
-        mcp = MCPAIComponent(mcp_server_url="http://localhost:8000")
-        models = mcp.list_models()
-        
-        # Check if we have a chat model available
-        chat_models = [model for model in models if model.get('id', '').endswith('-chat')]
+        mcp, chat_models = _get_chat_models("http://localhost:8000")
         
         if chat_models:
             log_info("Generating AI analysis of filesystem structure...")
@@ -152,17 +210,13 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
             # Prepare file type summary for prompt
             file_types_summary = "\n".join([
                 f"- {ext}: {count} files" 
-                for ext, count in sorted(
-                    result['file_types'].items(), 
-                    key=lambda x: x[1], 
-                    reverse=True
-                )[:10]
+                for ext, count in top_file_types
             ])
             
             # Prepare largest files summary
             largest_files_summary = "\n".join([
                 f"- {file_info['path']}: {file_info['size_bytes'] / (1024 * 1024):.2f} MB" 
-                for file_info in result['largest_files'][:5]
+                for file_info in top_largest_files
             ])
             
             # Create prompt
@@ -214,13 +268,11 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
         print(summary)
         
         print("\nTop 5 file types:")
-        for i, (ext, count) in enumerate(
-            sorted(result['file_types'].items(), key=lambda x: x[1], reverse=True)[:5]
-        ):
+        for i, (ext, count) in enumerate(top_file_types[:5]):
             print(f"{i+1}. {ext}: {count} files")
         
         print("\nTop 5 largest files:")
-        for i, file_info in enumerate(result['largest_files'][:5]):
+        for i, file_info in enumerate(top_largest_files):
             size_mb = file_info['size_bytes'] / (1024 * 1024)
             print(f"{i+1}. {file_info['path']} ({size_mb:.2f} MB)")
         
@@ -228,6 +280,12 @@ def analyze_filesystem(base_path: str = None, capture_output: bool = False) -> D
             print("\n=== AI Analysis ===")
             print(result["ai_analysis"])
     
+    if return_json:
+        # Serialize directly to bytes and drop the dict so it can be freed early
+        encoded = _dumps_bytes(result)
+        del result
+        return encoded
+    
     return result
 
 def file_system_demo(capture_output=False):
@@ -241,12 +299,13 @@ def file_system_demo(capture_output=False):
         list: List of operation results if capture_output is True, None otherwise
     """
     results = []
+    results_append = results.append
     
     def log_operation(operation, details):
         """Log an operation to results or print it"""
-        result = {"operation": operation, "details": details, "timestamp": datetime.now().isoformat()}
         if capture_output:
-            results.append(result)
+            # Record a raw timestamp; it is formatted once the demo finishes
+            results_append({"operation": operation, "details": details, "timestamp": time.time()})
         else:
             print(f"\n=== {operation} ===")
             for key, value in details.items():
@@ -342,6 +401,8 @@ def file_system_demo(capture_output=False):
     
     # If capturing output, return the results
     if capture_output:
+        for result in results:
+            result["timestamp"] = datetime.fromtimestamp(result["timestamp"]).isoformat()
         return results
 
 def test_filesystem():
@@ -356,15 +417,17 @@ def test_filesystem():
     
     # List current directory contents
     print("\nContents of current directory:")
-    contents = os.listdir(cwd)
-    for item in contents[:10]:  # Show only first 10 items to avoid spam
-        if os.path.isdir(os.path.join(cwd, item)):
-            print(f" - 📁 {item}/")
+    with os.scandir(cwd) as entries:
+        items = list(islice(entries, 10))  # Show only first 10 items to avoid spam
+        remaining = sum(1 for _ in entries)
+    for item in items:
+        if item.is_dir():
+            print(f" - 📁 {item.name}/")
         else:
-            print(f" - 📄 {item}")
+            print(f" - 📄 {item.name}")
     
-    if len(contents) > 10:
-        print(f" ... and {len(contents) - 10} more items")
+    if remaining:
+        print(f" ... and {remaining} more items")
     
     # Run the filesystem demo with printing
     print("\nRunning filesystem operations demo...")
@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 import os
+import re
 import sys
 import json
+import atexit
+import hashlib
 import argparse
+import threading
+import contextlib
+import functools
 import tempfile
+import time
 import subprocess
-from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Set
 from datetime import datetime
 
 # Add the parent directory to Python path for proper imports
@@ -15,6 +23,26 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from langflow import MCPAIComponent
+from script_utils import format_json, make_temporary_cache_dir, normalize_repo_url, write_file_atomic
+
+try:
+    # Read objects in-process through libgit2 when pygit2 is installed
+    import pygit2
+    HAVE_PYGIT2 = True
+except ImportError:
+    HAVE_PYGIT2 = False
+
+try:
+    # Serialize clone/fetch of a shared cache entry across processes (POSIX only)
+    import fcntl
+    HAVE_FCNTL = True
+except ImportError:
+    HAVE_FCNTL = False
+
+@functools.lru_cache(maxsize=1)
+def get_mcp(mcp_server_url: str = "http://localhost:8000") -> MCPAIComponent:
+    """Get a shared MCP client so repeated calls reuse its HTTP connections"""
+    return MCPAIComponent(mcp_server_url=mcp_server_url)
 
 def analyze_git_diff(repo_url: str, commit_sha: str, 
                    target_commit: str = 'HEAD', 
@@ -29,7 +57,8 @@ def analyze_git_diff(repo_url: str, commit_sha: str,
         capture_output: If True, capture and return the output instead of printing
         
     Returns:
-        Dict containing diff analysis information if capture_output=True
+        Dict containing diff analysis information if capture_output=True,
+        with the run time as integer nanoseconds in "timestamp_ns"
     """
     results = {}
     
@@ -38,17 +67,22 @@ def analyze_git_diff(repo_url: str, commit_sha: str,
         if capture_output:
             results[key] = value
         else:
-            print(f"\n=== {key} ===")
             if isinstance(value, (dict, list)):
-                print(json.dumps(value, indent=2))
-            else:
-                print(value)
+                value = format_json(value)
+            print(f"\n=== {key} ===\n{value}")
     
     log_result("analysis_type", "git_diff")
     log_result("repository", repo_url)
     log_result("base_commit", commit_sha)
     log_result("target_commit", target_commit)
-    log_result("timestamp", datetime.now().isoformat())
+    
+    # Captured results keep the raw clock reading; only the printed output
+    # needs it formatted
+    timestamp_ns = time.time_ns()
+    if capture_output:
+        results["timestamp_ns"] = timestamp_ns
+    else:
+        log_result("timestamp", datetime.fromtimestamp(timestamp_ns / 1e9).isoformat())
     
     # Validate the commit SHA
     try:
@@ -68,41 +102,42 @@ def analyze_git_diff(repo_url: str, commit_sha: str,
     
     # Get the diff between commits
     try:
-        diff_text = get_diff_between_commits(repo_url, commit_sha, target_commit)
-        
-        # Extract basic statistics
-        diff_stats = {
-            "total_lines": len(diff_text.splitlines()),
-            "files_changed": diff_text.count("diff --git"),
-            "additions": diff_text.count("\n+") - diff_text.count("\n+++"),
-            "deletions": diff_text.count("\n-") - diff_text.count("\n---"),
-        }
+        diff_stats, changed_paths = get_diff_summary(repo_url, commit_sha, target_commit)
         
         log_result("diff_stats", diff_stats)
         
-        # Check for requirements.txt changes with enhanced analysis
-        try:
-            # Try to get a more detailed requirements analysis using MCPAIComponent
+        # Only ask for a dependency analysis when requirements.txt changed; when
+        # the diff failed there are no paths, so assume that it did
+        if changed_paths is not None and "requirements.txt" not in changed_paths:
+            log_result("requirements_changes", {"added": [], "removed": [], "changed": []})
+        else:
+            # Check for requirements.txt changes with enhanced analysis
             try:
-                mcp = MCPAIComponent(mcp_server_url="http://localhost:8000")
-                
-                # First check if the enhanced requirements analysis is available
-                req_analysis = mcp.analyze_requirements(repo_url, commit_sha, target_commit)
+                # Try to get a more detailed requirements analysis using MCPAIComponent
+                req_analysis = None
+                try:
+                    mcp = get_mcp()
+                    
+                    # First check if the enhanced requirements analysis is available
+                    req_analysis = mcp.analyze_requirements(repo_url, commit_sha, target_commit)
+                except Exception as e:
+                    log_result("requirements_analysis_error", str(e))
                 
                 if req_analysis and isinstance(req_analysis, dict) and 'status' in req_analysis and req_analysis['status'] != 'error':
                     log_result("requirements_analysis", req_analysis)
                     
-                    # Log detailed information about potential issues and recommendations
-                    if 'potential_issues' in req_analysis and req_analysis['potential_issues']:
-                        log_result("potential_dependency_issues", req_analysis['potential_issues'])
-                    
-                    if 'recommendations' in req_analysis and req_analysis['recommendations']:
-                        log_result("dependency_recommendations", req_analysis['recommendations'])
+                    # Break out potential issues and recommendations for callers of the
+                    # captured results; printed output already shows them inside the analysis
+                    if capture_output:
+                        if req_analysis.get('potential_issues'):
+                            log_result("potential_dependency_issues", req_analysis['potential_issues'])
+                        
+                        if req_analysis.get('recommendations'):
+                            log_result("dependency_recommendations", req_analysis['recommendations'])
                     
                 else:
                     # Fall back to basic requirements comparison if enhanced analysis failed
-                    old_requirements = get_file_from_commit(repo_url, commit_sha, "requirements.txt")
-                    new_requirements = get_file_from_commit(repo_url, target_commit, "requirements.txt")
+                    old_requirements, new_requirements = get_file_pair(repo_url, commit_sha, target_commit, "requirements.txt")
                     
                     if old_requirements is not None and new_requirements is not None:
                         added, removed, changed = compare_requirements(new_requirements, old_requirements)
@@ -114,28 +149,8 @@ def analyze_git_diff(repo_url: str, commit_sha: str,
                         }
                         
                         log_result("requirements_changes", req_changes)
-                    
             except Exception as e:
                 log_result("requirements_analysis_error", str(e))
-                
-                # Fallback to basic requirements comparison
-                old_requirements = get_file_from_commit(repo_url, commit_sha, "requirements.txt")
-                new_requirements = get_file_from_commit(repo_url, target_commit, "requirements.txt")
-                
-                if old_requirements is not None and new_requirements is not None:
-                    added, removed, changed = compare_requirements(new_requirements, old_requirements)
-                    
-                    req_changes = {
-                        "added": added,
-                        "removed": removed,
-                        "changed": changed,
-                    }
-                    
-                    log_result("requirements_changes", req_changes)
-        except Exception as e:
-            log_result("requirements_analysis_error", str(e))
-        
-        # Try to get a more detailed diff analysis using MCPAIComponent
     
     except Exception as e:
         log_result("error", str(e))
@@ -146,6 +161,105 @@ def analyze_git_diff(repo_url: str, commit_sha: str,
     else:
         return {"status": "completed", "output": "printed to console"}
 
+def analyze_git_diff_many(repo_url: str, commit_pairs: Iterable[Tuple[str, str]],
+                          capture_output: bool = True) -> List[Dict[str, Any]]:
+    """
+    Analyze the diffs for several pairs of commits in one Git repository.
+    
+    The repository is cloned or fetched once up front, and every analysis
+    reuses that clone and its cat-file processes.
+    
+    Args:
+        repo_url: URL of the Git repository to analyze
+        commit_pairs: (base commit, target commit) pairs to compare
+        capture_output: If True, capture and return the output instead of printing
+        
+    Returns:
+        One analyze_git_diff result per pair, in order. If the repository
+        can't be cloned, each result reports the error the same way
+        analyze_git_diff does.
+    """
+    commit_pairs = list(commit_pairs)
+    try:
+        ensure_bare_clone(repo_url)
+    except (subprocess.CalledProcessError, OSError) as e:
+        # Without a clone none of the analyses can run; don't retry it per pair.
+        # OSError covers a missing git binary and a cache lock that can't be taken
+        if isinstance(e, subprocess.CalledProcessError):
+            message = f"Error cloning repository: {e.stderr.decode('utf-8', errors='replace').strip()}"
+        else:
+            message = f"Error cloning repository: {e}"
+        
+        if not capture_output:
+            print(f"\n=== error ===\n{message}")
+            return [{"status": "error", "message": message} for _ in commit_pairs]
+        
+        timestamp_ns = time.time_ns()
+        return [
+            {
+                "analysis_type": "git_diff",
+                "repository": repo_url,
+                "base_commit": base_commit,
+                "target_commit": target_commit,
+                "timestamp_ns": timestamp_ns,
+                "error": message,
+            }
+            for base_commit, target_commit in commit_pairs
+        ]
+    
+    return [
+        analyze_git_diff(repo_url, base_commit, target_commit, capture_output=capture_output)
+        for base_commit, target_commit in commit_pairs
+    ]
+
+# One line of a requirements file: a comment; or a package name (with optional
+# extras), an optional version operator and version, optional environment markers
+# and an optional trailing comment; or, failing that, any other text
+REQUIREMENT_LINE_PATTERN = re.compile(
+    r'^[ \t]*(?:#.*|([A-Za-z0-9][A-Za-z0-9._\-]*(?:\[[^\]\n]*\])?)[ \t]*(===|==|~=|!=|>=|<=|>|<)?[ \t]*(.*?)'
+    r'[ \t]*(?:;[^#\n]*)?(?:#.*)?|(.*?))[ \t\r]*$',
+    re.MULTILINE
+)
+
+# Runs of '-', '_' and '.' in package names are equivalent (PEP 503)
+NAME_SEPARATOR_PATTERN = re.compile(r'[-_.]+')
+
+@functools.lru_cache(maxsize=256)
+def parse_requirements(content: str) -> Dict[str, str]:
+    """
+    Parse requirements.txt content into a dictionary of package name -> version.
+    
+    The same file content is often compared many times, e.g. when analyzing
+    several commit pairs, so results are cached; callers must not modify them.
+    """
+    result = {}
+    # One pass over the whole file; every line yields exactly one match
+    for match in REQUIREMENT_LINE_PATTERN.finditer(content):
+        pkg_name, operator, version, other = match.groups()
+        if pkg_name is None:
+            # Comments and empty lines leave nothing; other formats are kept verbatim
+            if other:
+                result[other] = "any"
+            continue
+        
+        if operator is None and version:
+            # Just package name or other format
+            result[match.group(0).strip()] = "any"
+            continue
+        
+        # Compare names case-insensitively so 'Flask' and 'flask' are the same package
+        pkg_name = NAME_SEPARATOR_PATTERN.sub('-', pkg_name).lower()
+        if operator is None:
+            result[pkg_name] = "any"
+        elif operator == "==":
+            # Standard version pinning (pkg==1.0.0)
+            result[pkg_name] = version
+        else:
+            # Version range (pkg>=1.0.0, pkg<2, ...)
+            result[pkg_name] = f"{operator}{version}"
+            
+    return result
+
 def compare_requirements(current_reqs: str, previous_reqs: str) -> Tuple[List[str], List[str], List[str]]:
     """
     Compare two requirements.txt files and identify added, removed, and changed dependencies.
@@ -158,144 +272,461 @@ def compare_requirements(current_reqs: str, previous_reqs: str) -> Tuple[List[st
         Tuple of (added, removed, changed) dependencies
     """
     
-    def parse_requirements(content: str) -> Dict[str, str]:
-        """Parse requirements.txt content into a dictionary of package name -> version."""
-        if not content or content.strip() == "":
-            return {}
-            
-        result = {}
-        for line in content.splitlines():
-            # Skip empty lines and comments
-            if not line.strip() or line.strip().startswith('#'):
-                continue
-                
-            # Handle different formats: pkg==version, pkg>=version, etc.
-            parts = line.split('==')
-            if len(parts) == 2:
-                # Standard version pinning (pkg==1.0.0)
-                pkg_name = parts[0].strip()
-                version = parts[1].strip()
-                result[pkg_name] = version
-            elif '>=' in line:
-                # Minimum version (pkg>=1.0.0)
-                parts = line.split('>=')
-                pkg_name = parts[0].strip()
-                version = parts[1].strip()
-                result[pkg_name] = f">={version}"
-            elif '>' in line:
-                # Greater than version (pkg>1.0.0)
-                parts = line.split('>')
-                pkg_name = parts[0].strip()
-                version = parts[1].strip()
-                result[pkg_name] = f">{version}"
-            elif '<=' in line:
-                # Maximum version (pkg<=1.0.0)
-                parts = line.split('<=')
-                pkg_name = parts[0].strip()
-                version = parts[1].strip()
-                result[pkg_name] = f"<={version}"
-            elif '<' in line:
-                # Less than version (pkg<1.0.0)
-                parts = line.split('<')
-                pkg_name = parts[0].strip()
-                version = parts[1].strip()
-                result[pkg_name] = f"<{version}"
-            else:
-                # Just package name or other format
-                pkg_name = line.strip()
-                result[pkg_name] = "any"
-                
-        return result
+    # Identical files can't differ in any dependency
+    if current_reqs == previous_reqs:
+        return [], [], []
+    
+    current_pkgs = parse_requirements(current_reqs or "")
+    previous_pkgs = parse_requirements(previous_reqs or "")
     
-    current_pkgs = parse_requirements(current_reqs)
-    previous_pkgs = parse_requirements(previous_reqs)
+    current_names = current_pkgs.keys()
+    previous_names = previous_pkgs.keys()
     
     # Find added packages
-    added = [f"{pkg}=={version}" for pkg, version in current_pkgs.items() 
-             if pkg not in previous_pkgs]
+    added = [f"{pkg}=={current_pkgs[pkg]}" for pkg in sorted(current_names - previous_names)]
     
     # Find removed packages
-    removed = [f"{pkg}=={version}" for pkg, version in previous_pkgs.items() 
-               if pkg not in current_pkgs]
+    removed = [f"{pkg}=={previous_pkgs[pkg]}" for pkg in sorted(previous_names - current_names)]
     
-    # Find changed versions
-    changed = [f"{pkg}: {previous_pkgs[pkg]} -> {current_pkgs[pkg]}" 
-               for pkg in current_pkgs 
-               if pkg in previous_pkgs and current_pkgs[pkg] != previous_pkgs[pkg]]
+    # Find changed versions, looking only at packages present in both
+    changed = []
+    for pkg in sorted(current_names & previous_names):
+        current_version = current_pkgs[pkg]
+        previous_version = previous_pkgs[pkg]
+        if current_version != previous_version:
+            changed.append(f"{pkg}: {previous_version} -> {current_version}")
     
     return added, removed, changed
 
-def get_file_from_commit(repo_url: str, commit_sha: str, file_path: str) -> Optional[str]:
+# Bare partial clones and file contents shared by the git helpers below, kept across runs
+CACHE_DIR = os.environ.get('MCP_GIT_CACHE_DIR', os.path.join(os.path.expanduser("~"), ".cache", "mcp_git_diff"))
+
+# Only full commit SHAs name immutable content that is safe to cache on disk
+FULL_SHA_PATTERN = re.compile(r'[0-9a-fA-F]{40}')
+
+# Anything git could parse as a revision: no whitespace or control characters
+REVISION_PATTERN = re.compile(r'[^\s\x00-\x1f\x7f]+')
+
+def cache_key(*parts: str) -> str:
+    """Build a content cache key from a normalized repository URL and object names"""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+def read_cache(key: str) -> Optional[bytes]:
+    """Read a cached entry, or None if it isn't cached"""
+    try:
+        with open(os.path.join(CACHE_DIR, "objects", key[:2], key), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write_cache(key: str, data: bytes):
+    """Store an entry in the content cache, replacing it atomically"""
+    try:
+        write_file_atomic(os.path.join(CACHE_DIR, "objects", key[:2], key), data)
+    except OSError as e:
+        print(f"Warning: Could not write git cache entry: {e}")
+
+def get_clone_dir(repo_url: str) -> str:
+    """Get the cache directory holding the bare clone of a repository"""
+    return os.path.join(CACHE_DIR, "repos", hashlib.sha1(normalize_repo_url(repo_url).encode()).hexdigest())
+
+def has_clone(repo_url: str) -> bool:
+    """Check whether an earlier run already left a bare clone of the repository"""
+    return os.path.isdir(os.path.join(get_clone_dir(repo_url), "objects"))
+
+@contextlib.contextmanager
+def clone_lock(repo_dir: str):
+    """Hold an exclusive lock on a cached clone while it is being cloned or fetched"""
+    if not HAVE_FCNTL:
+        yield
+        return
+    
+    os.makedirs(os.path.dirname(repo_dir), exist_ok=True)
+    with open(repo_dir + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@functools.lru_cache(maxsize=None)
+def ensure_bare_clone(repo_url: str) -> str:
     """
-    Get the content of a file from a specific commit in a Git repository.
+    Get a local bare partial clone of a Git repository.
+    
+    The first call in a process clones the repository into CACHE_DIR, or
+    fetches new commits if an earlier run already cloned it, so branches
+    and HEAD are never older than the start of this process. Later calls
+    return the same directory.
     
     Args:
         repo_url: URL of the Git repository
-        commit_sha: Commit SHA to extract the file from
-        file_path: Path to the file within the repository
         
     Returns:
-        Content of the file or None if the file doesn't exist in that commit
+        Path of the bare clone
     """
-    try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
-        
-        # Clone the repository (shallow clone to save time and space)
-        subprocess.run(
-            ["git", "clone", "--depth", "1", repo_url, temp_dir],
-            check=True,
-            capture_output=True
-        )
-        
-        # Check out the specific commit
-        try:
-            subprocess.run(
-                ["git", "checkout", commit_sha],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True
-            )
-        except subprocess.CalledProcessError:
-            # Try fetching the commit first
+    repo_dir = get_clone_dir(repo_url)
+    
+    # Another process may be cloning or fetching the same cache entry
+    with clone_lock(repo_dir):
+        if has_clone(repo_url):
+            # Bare clones have no fetch refspec, so update the branches explicitly
             subprocess.run(
-                ["git", "fetch", "--depth", "1", "origin", commit_sha],
-                cwd=temp_dir,
+                ["git", "-C", repo_dir, "fetch", "--prune", "--filter=blob:none",
+                 "origin", "+refs/heads/*:refs/heads/*"],
                 check=True,
                 capture_output=True
             )
-            
-            # Now try to check out again
+            return repo_dir
+        
+        # Clone next to the final location and move it into place, so an
+        # interrupted clone never looks like a usable cache entry
+        os.makedirs(os.path.dirname(repo_dir), exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(repo_dir), ignore_cleanup_errors=True) as temp_dir:
             subprocess.run(
-                ["git", "checkout", commit_sha],
-                cwd=temp_dir,
+                ["git", "clone", "--bare", "--filter=blob:none", repo_url, temp_dir],
                 check=True,
                 capture_output=True
             )
+            os.rename(temp_dir, repo_dir)
+    
+    return repo_dir
+
+class CatFileBatch:
+    """A long-running 'git cat-file' process that answers object queries over a pipe"""
+    
+    def __init__(self, repo_dir: str, batch_check: bool = False):
+        self.batch_check = batch_check
+        # Requests and responses share one pipe, so queries from threads must not interleave
+        self.lock = threading.Lock()
+        # Only the content process may fetch blobs missing from the partial clone;
+        # an existence check must not turn into a fetch (honored by git 2.44+).
+        # Failed fetches are reported as missing objects, so their messages go
+        # nowhere instead of the user's terminal
+        env = {**os.environ, "GIT_NO_LAZY_FETCH": "1"} if batch_check else None
+        self.process = subprocess.Popen(
+            ["git", "-C", repo_dir, "cat-file", "--batch-check" if batch_check else "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env
+        )
+    
+    def query(self, object_name: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Look up an object such as '<sha>' or '<sha>:<path>'.
+        
+        Returns:
+            Tuple of (object type, content) or None if the object doesn't exist.
+            The content is empty in batch-check mode.
+        """
+        return self.query_many([object_name])[0]
+    
+    def query_many(self, object_names: List[str]) -> List[Optional[Tuple[str, bytes]]]:
+        """
+        Look up several objects, sending all requests before reading any response
+        so git can work through them without waiting on a round trip each.
         
-        # Check if the file exists
-        file_full_path = os.path.join(temp_dir, file_path)
-        if not os.path.isfile(file_full_path):
+        Returns:
+            One result per name, in order, as returned by query()
+        """
+        with self.lock:
+            self.process.stdin.write("".join(f"{name}\n" for name in object_names).encode())
+            self.process.stdin.flush()
+            return [self._read_response() for _ in object_names]
+    
+    def _read_response(self) -> Optional[Tuple[str, bytes]]:
+        """Read the response to one query from the pipe"""
+        # The header is "<sha> <type> <size>", or "<name> missing" / "<name> ambiguous"
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
             return None
         
-        # Read the file content
-        with open(file_full_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        object_type = header[1].decode()
+        if self.batch_check:
+            return object_type, b""
         
-        # Clean up
-        import shutil
-        shutil.rmtree(temp_dir)
+        # The content is followed by a single newline
+        size = int(header[2])
+        content = self.process.stdout.read(size)
+        self.process.stdout.read(1)
+        return object_type, content
+    
+    def close(self):
+        """Stop the cat-file process"""
+        self.process.stdin.close()
+        self.process.wait()
+
+@functools.lru_cache(maxsize=None)
+def get_cat_file(repo_dir: str, batch_check: bool = False) -> CatFileBatch:
+    """Get the shared cat-file process for a repository, starting it on first use"""
+    batch = CatFileBatch(repo_dir, batch_check)
+    atexit.register(batch.close)
+    return batch
+
+@functools.lru_cache(maxsize=None)
+def open_repository(repo_dir: str) -> "pygit2.Repository":
+    """Open a clone with pygit2, reusing the handle for later lookups"""
+    return pygit2.Repository(repo_dir)
+
+def lookup_object(repo_dir: str, object_name: str) -> Optional["pygit2.Object"]:
+    """
+    Look up an object such as '<sha>' or '<sha>:<path>' in-process with pygit2.
+    
+    Returns None if pygit2 isn't installed or the object isn't available locally.
+    libgit2 can't fetch blobs left out of a partial clone, so callers fall back
+    to the git command line in that case.
+    """
+    if not HAVE_PYGIT2:
+        return None
+    try:
+        return open_repository(repo_dir).revparse_single(object_name)
+    except (KeyError, ValueError, pygit2.GitError):
+        return None
+
+def get_object_type(repo_dir: str, object_name: str) -> Optional[str]:
+    """Get the type of an object in a clone, or None if it doesn't exist"""
+    obj = lookup_object(repo_dir, object_name)
+    if obj is not None:
+        return obj.type_str
+    
+    # pygit2 has already searched the local object store for this full SHA;
+    # asking cat-file as well could only add a lazy fetch from the remote
+    if HAVE_PYGIT2 and FULL_SHA_PATTERN.fullmatch(object_name):
+        return None
+    
+    result = get_cat_file(repo_dir, batch_check=True).query(object_name)
+    return result[0] if result is not None else None
+
+class GitRepoSession:
+    """
+    Object lookups and diffs against the cached bare clone of one repository.
+    
+    Entering the session clones the repository, or fetches new commits, once
+    per process. A session that only needs commits named by full SHA skips
+    that fetch when the cached clone already has them all. Blobs are read
+    in-process with pygit2 when possible and otherwise through the shared
+    cat-file processes, which stay alive across sessions and stop when the
+    interpreter exits.
+    """
+    
+    def __init__(self, repo_url: str, commits: Iterable[str] = ()):
+        self.repo_url = repo_url
+        self.commits = list(commits)
+        self.repo_dir = None
+    
+    def __enter__(self) -> "GitRepoSession":
+        if self.commits and self.has_commits_locally():
+            self.repo_dir = get_clone_dir(self.repo_url)
+        else:
+            self.repo_dir = ensure_bare_clone(self.repo_url)
+        return self
+    
+    def has_commits_locally(self) -> bool:
+        """Check whether the cached clone already has every commit this session needs"""
+        # Only full SHAs name commits that can't move, and only pygit2 can look
+        # for them without git lazily fetching whatever is missing
+        if not HAVE_PYGIT2 or not has_clone(self.repo_url):
+            return False
+        if not all(FULL_SHA_PATTERN.fullmatch(commit) for commit in self.commits):
+            return False
+        repo_dir = get_clone_dir(self.repo_url)
+        for commit in self.commits:
+            obj = lookup_object(repo_dir, commit)
+            if obj is None or obj.type_str != "commit":
+                return False
+        return True
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+    
+    def object_type(self, object_name: str) -> Optional[str]:
+        """Get the type of an object such as '<sha>', or None if it doesn't exist"""
+        return get_object_type(self.repo_dir, object_name)
+    
+    def get_blobs(self, revisions: List[str], file_path: str) -> List[Optional[bytes]]:
+        """Get a file's raw content at several commits, None where it doesn't exist"""
+        contents = []
+        unread = []
+        for index, revision in enumerate(revisions):
+            blob = lookup_object(self.repo_dir, f"{revision}:{file_path}")
+            if blob is not None and blob.type_str == "blob":
+                contents.append(blob.data)
+            else:
+                contents.append(None)
+                unread.append(index)
         
-        return content
-    except Exception as e:
-        print(f"Error getting file '{file_path}' from commit {commit_sha}: {e}")
-        # Clean up on error
+        if unread:
+            # Not readable in-process; cat-file also fetches blobs missing from the partial clone
+            results = get_cat_file(self.repo_dir).query_many(
+                [f"{revisions[index]}:{file_path}" for index in unread])
+            for index, result in zip(unread, results):
+                if result is not None and result[0] == "blob":
+                    contents[index] = result[1]
+        
+        return contents
+    
+    def diff_summary(self, base_commit: str, target_commit: str) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Get statistics and changed paths for the diff between two commits.
+        
+        The patch is streamed from git and only its newlines are counted, so
+        memory use doesn't grow with the size of the diff. The per-file counts
+        come from --numstat in the same git run.
+        
+        Returns:
+            Tuple of (stats with total_lines, files_changed, additions and
+            deletions; paths changed on either side)
+        """
+        # stderr goes to a file so that a chatty lazy fetch can't fill its pipe and stall git
+        stderr_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            ["git", "-C", self.repo_dir, "diff", "--numstat", "--patch", base_commit, target_commit],
+            stdout=subprocess.PIPE,
+            stderr=stderr_file
+        )
+        stats = {"total_lines": 0, "files_changed": 0, "additions": 0, "deletions": 0}
+        paths = []
+        
+        # The --numstat lines come first and end with a blank line; binary files show '-' counts
+        for line in iter(process.stdout.readline, b""):
+            if line == b"\n":
+                break
+            added, deleted, path = line.rstrip(b"\n").split(b"\t", 2)
+            stats["files_changed"] += 1
+            if added != b"-":
+                stats["additions"] += int(added)
+                stats["deletions"] += int(deleted)
+            paths.extend(numstat_paths(path.decode('utf-8', errors='replace')))
+        
+        for chunk in iter(lambda: process.stdout.read(1 << 20), b""):
+            stats["total_lines"] += chunk.count(b"\n")
+        
+        process.stdout.close()
+        with stderr_file:
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr_file.read())
+        return stats, paths
+
+def numstat_paths(path: str) -> List[str]:
+    """
+    Split a --numstat path into the paths it names.
+    
+    Renames are shown as 'old => new' or 'dir/{old => new}/file'; both sides
+    count as changed.
+    """
+    if " => " not in path:
+        return [path]
+    if "{" in path:
+        prefix, rest = path.split("{", 1)
+        inner, suffix = rest.split("}", 1)
+        old, new = inner.split(" => ", 1)
+        
+        def join(side: str) -> str:
+            if side:
+                return prefix + side + suffix
+            # An empty side would leave a doubled slash ('dir/{ => sub}/file')
+            # or a leading one ('{ => sub}/file'), so drop the empty segment
+            return "/".join(part for part in (prefix.rstrip("/"), suffix.lstrip("/")) if part)
+        
+        return [join(old), join(new)]
+    return path.split(" => ", 1)
+
+def read_blobs(repo_url: str, revisions: List[str], file_path: str) -> List[Optional[bytes]]:
+    """
+    Read a file's raw content at several commits.
+    
+    Blobs that are neither in the disk cache nor in the partial clone are
+    fetched together, and the rest are read with one batch of queries.
+    
+    Returns:
+        One entry per revision: the content, or None if the file doesn't exist there
+    """
+    contents = [None] * len(revisions)
+    keys = [None] * len(revisions)
+    unread = []
+    for index, revision in enumerate(revisions):
+        # Content at a full SHA never changes, so it can be served from the disk cache
+        if FULL_SHA_PATTERN.fullmatch(revision):
+            keys[index] = cache_key(normalize_repo_url(repo_url), revision.lower(), file_path)
+            contents[index] = read_cache(keys[index])
+        if contents[index] is None:
+            unread.append(index)
+    
+    if not unread:
+        return contents
+    
+    unread_revisions = [revisions[index] for index in unread]
+    with GitRepoSession(repo_url, unread_revisions) as session:
+        if len(unread) > 1:
+            prefetch_blobs(session.repo_dir, unread_revisions, file_path)
+        for index, content in zip(unread, session.get_blobs(unread_revisions, file_path)):
+            contents[index] = content
+            if content is not None and keys[index] is not None:
+                write_cache(keys[index], content)
+    
+    return contents
+
+def prefetch_blobs(repo_dir: str, revisions: Iterable[str], file_path: str):
+    """
+    Fetch a file's blobs at several commits with a single request.
+    
+    Reading them one by one from the partial clone costs one lazy fetch per
+    missing blob. The blob IDs come from the trees, which the clone already
+    has, so this needs pygit2; without it the blobs are fetched lazily as before.
+    """
+    if not HAVE_PYGIT2:
+        return
+    
+    repo = open_repository(repo_dir)
+    missing = set()
+    for revision in revisions:
+        commit = lookup_object(repo_dir, revision)
+        if commit is None:
+            continue
         try:
-            import shutil
-            shutil.rmtree(temp_dir)
-        except:
-            pass
-        return None
+            entry = commit.peel(pygit2.Commit).tree[file_path]
+        except (KeyError, ValueError, pygit2.GitError):
+            continue
+        if entry.type_str == "blob" and entry.id not in repo:
+            missing.add(str(entry.id))
+    
+    # A single missing blob is fetched just as fast on demand
+    if len(missing) > 1:
+        with clone_lock(repo_dir):
+            subprocess.run(
+                ["git", "-C", repo_dir, "fetch", "--no-tags", "--no-write-fetch-head",
+                 "origin", *sorted(missing)],
+                capture_output=True
+            )
+
+def get_file_pair(repo_url: str, base_commit: str, target_commit: str,
+                  file_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Get the content of a file at two commits, fetching missing blobs together.
+    
+    Returns:
+        (base content, target content); each is None if the file doesn't exist
+        in that commit
+    """
+    try:
+        contents = read_blobs(repo_url, [base_commit, target_commit], file_path)
+    except Exception as e:
+        print(f"Error getting file '{file_path}' from commits {base_commit} and {target_commit}: {e}")
+        return None, None
+    
+    base_content, target_content = (
+        content.decode('utf-8', errors='replace') if content is not None else None
+        for content in contents
+    )
+    return base_content, target_content
+
+# (repository URL, commit) pairs already found valid in this process. The
+# clone is brought up to date at most once per process, so a commit that
+# was valid stays valid; a negative answer may come from a transient error
+# and is always checked again.
+validated_commits: Set[Tuple[str, str]] = set()
 
 def validate_commit_sha(repo_url: str, commit_sha: str) -> bool:
     """
@@ -308,119 +739,81 @@ def validate_commit_sha(repo_url: str, commit_sha: str) -> bool:
     Returns:
         True if the commit SHA exists, False otherwise
     """
+    if (repo_url, commit_sha) in validated_commits:
+        return True
+    
+    is_valid = check_commit_sha(repo_url, commit_sha)
+    if is_valid:
+        validated_commits.add((repo_url, commit_sha))
+    return is_valid
+
+def check_commit_sha(repo_url: str, commit_sha: str) -> bool:
+    """Check whether a commit SHA exists in a repository, without the in-process memo"""
+    # Input that can't name a revision is rejected without running git
+    if not REVISION_PATTERN.fullmatch(commit_sha):
+        return False
+    
+    # A full SHA that was validated before is known to exist
+    key = None
+    if FULL_SHA_PATTERN.fullmatch(commit_sha):
+        key = cache_key(normalize_repo_url(repo_url), commit_sha.lower())
+        if read_cache(key) is not None:
+            return True
+    
     try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
-        
-        # Clone the repository (shallow clone to save time and space)
-        subprocess.run(
-            ["git", "clone", "--depth", "1", repo_url, temp_dir],
-            check=True,
-            capture_output=True
-        )
+        with GitRepoSession(repo_url, [commit_sha]) as session:
+            object_type = session.object_type(commit_sha)
+            # Only a full SHA or a full ref name can be fetched by name; anything
+            # else (abbreviated SHAs, HEAD~2, typos) is settled by the local lookup
+            if object_type is None and (key is not None or commit_sha.startswith("refs/")):
+                # The commit may not be reachable from any branch; try fetching it directly
+                with clone_lock(session.repo_dir):
+                    fetch = subprocess.run(
+                        ["git", "-C", session.repo_dir, "fetch", "--filter=blob:none", "--no-tags", "origin", commit_sha],
+                        capture_output=True
+                    )
+                if fetch.returncode != 0:
+                    return False
+                object_type = session.object_type(commit_sha)
         
-        # Try to show the commit details
-        try:
-            # First, try to fetch the specific commit
-            subprocess.run(
-                ["git", "fetch", "--depth", "1", "origin", commit_sha],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True
-            )
-            
-            # Then, check if the commit exists
-            result = subprocess.run(
-                ["git", "cat-file", "-t", commit_sha],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            # Clean up
-            import shutil
-            shutil.rmtree(temp_dir)
-            
-            # If the command succeeded, and returned "commit", the SHA is valid
-            return result.stdout.strip() == "commit"
-        except subprocess.CalledProcessError:
-            # Clean up on error
-            import shutil
-            shutil.rmtree(temp_dir)
-            return False
+        # The SHA is valid if it names a commit
+        is_valid = object_type == "commit"
+        if is_valid and key is not None:
+            write_cache(key, b"commit")
+        return is_valid
     except Exception as e:
         print(f"Error validating commit SHA: {e}")
-        # Clean up on error
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-        except:
-            pass
         return False
 
-def get_diff_between_commits(repo_url: str, base_commit: str, target_commit: str = 'HEAD') -> str:
+def get_diff_summary(repo_url: str, base_commit: str,
+                     target_commit: str = 'HEAD') -> Tuple[Dict[str, int], Optional[List[str]]]:
     """
-    Get the diff between two commits in a Git repository.
+    Get the statistics of the diff between two commits without keeping the diff itself.
     
-    Args:
-        repo_url: URL of the Git repository
-        base_commit: Base commit SHA
-        target_commit: Target commit SHA (default: HEAD)
-        
     Returns:
-        Diff text between the commits
+        Tuple of (stats with total_lines, files_changed, additions and
+        deletions; changed paths). On failure the counts are zero and the
+        paths are None.
     """
+    # A summary between two full SHAs never changes, so it can be served from the disk cache
+    key = None
+    if FULL_SHA_PATTERN.fullmatch(base_commit) and FULL_SHA_PATTERN.fullmatch(target_commit):
+        key = cache_key(normalize_repo_url(repo_url), base_commit.lower(), target_commit.lower(), "diff-summary")
+        cached = read_cache(key)
+        if cached is not None:
+            summary = json.loads(cached)
+            return summary["stats"], summary["paths"]
+    
     try:
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
-        
-        # Clone the repository
-        subprocess.run(
-            ["git", "clone", "--depth", "1", repo_url, temp_dir],
-            check=True,
-            capture_output=True
-        )
-        
-        # Try to fetch both commits
-        subprocess.run(
-            ["git", "fetch", "--depth", "1", "origin", base_commit],
-            cwd=temp_dir,
-            check=True,
-            capture_output=True
-        )
-        
-        if target_commit != 'HEAD':
-            subprocess.run(
-                ["git", "fetch", "--depth", "1", "origin", target_commit],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True
-            )
-        
-        # Get the diff
-        result = subprocess.run(
-            ["git", "diff", base_commit, target_commit],
-            cwd=temp_dir,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        
-        # Clean up
-        import shutil
-        shutil.rmtree(temp_dir)
-        
-        return result.stdout
+        with GitRepoSession(repo_url, [base_commit, target_commit]) as session:
+            stats, paths = session.diff_summary(base_commit, target_commit)
     except Exception as e:
         print(f"Error getting diff between commits: {e}")
-        # Clean up on error
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-        except:
-            pass
-        return f"Error: {str(e)}"
+        return {"total_lines": 0, "files_changed": 0, "additions": 0, "deletions": 0}, None
+    
+    if key is not None:
+        write_cache(key, json.dumps({"stats": stats, "paths": paths}).encode())
+    return stats, paths
 
 def test_git_diff(repo_url=None, compare_commit=None):
     """
@@ -449,6 +842,14 @@ def test_git_diff(repo_url=None, compare_commit=None):
     if compare_commit:
         print(f"Comparing against commit: {compare_commit}")
         
+        # Clone the repository once up front; validation, diffs and file reads
+        # below all run against this same clone
+        try:
+            ensure_bare_clone(repo_url)
+        except subprocess.CalledProcessError as e:
+            print(f"Error cloning repository: {e.stderr.decode('utf-8', errors='replace').strip()}")
+            return
+        
         # Validate the commit SHA
         print(f"Validating commit SHA: {compare_commit}")
         is_valid = validate_commit_sha(repo_url, compare_commit)
@@ -456,93 +857,96 @@ def test_git_diff(repo_url=None, compare_commit=None):
         if is_valid:
             print(f"Commit SHA {compare_commit} is valid.")
             
-            # Get the diff
+            # The comprehensive analysis doesn't depend on the local diff, so run
+            # them together; the dependency analysis is only requested once the
+            # diff shows that requirements.txt changed at all
             print(f"Getting diff between {compare_commit} and HEAD...")
-            diff = get_diff_between_commits(repo_url, compare_commit)
+            mcp = get_mcp()
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                diff_future = executor.submit(get_diff_summary, repo_url, compare_commit)
+                comprehensive_future = executor.submit(mcp.analyze_comprehensive, repo_url, compare_commit)
+                
+                diff_stats, changed_paths = diff_future.result()
+                req_future = None
+                if changed_paths is None or "requirements.txt" in changed_paths:
+                    req_future = executor.submit(mcp.analyze_requirements, repo_url, compare_commit)
             
             # Show basic statistics
-            diff_lines = diff.splitlines()
-            files_changed = diff.count("diff --git")
-            additions = diff.count("\n+") - diff.count("\n+++")
-            deletions = diff.count("\n-") - diff.count("\n---")
-            
-            print(f"\nDiff Statistics:")
-            print(f"Files changed: {files_changed}")
-            print(f"Additions: {additions}")
-            print(f"Deletions: {deletions}")
-            print(f"Total diff lines: {len(diff_lines)}")
+            print(f"\nDiff Statistics:\n"
+                  f"Files changed: {diff_stats['files_changed']}\n"
+                  f"Additions: {diff_stats['additions']}\n"
+                  f"Deletions: {diff_stats['deletions']}\n"
+                  f"Total diff lines: {diff_stats['total_lines']}")
             
             # Check for requirements.txt changes with enhanced analysis
             print("\nAnalyzing requirements.txt changes...")
             
-            try:
-                # Try to get a more detailed requirements analysis
-                mcp = MCPAIComponent(mcp_server_url="http://localhost:8000")
-                
-                req_analysis = mcp.analyze_requirements(repo_url, compare_commit)
-                
-                if req_analysis and isinstance(req_analysis, dict) and req_analysis.get('status') != 'error':
-                    print("\nEnhanced Requirements Analysis:")
-                    
-                    # Print summary
-                    if 'summary' in req_analysis:
-                        print(f"\nSummary: {req_analysis['summary']}")
-                    
-                    # Print added packages
-                    if 'added_packages' in req_analysis and req_analysis['added_packages']:
-                        print("\nAdded Dependencies:")
-                        for pkg_name, ver_spec in req_analysis['added_packages'].items():
-                            print(f"  + {pkg_name}{ver_spec}")
-                    
-                    # Print removed packages
-                    if 'removed_packages' in req_analysis and req_analysis['removed_packages']:
-                        print("\nRemoved Dependencies:")
-                        for pkg_name, ver_spec in req_analysis['removed_packages'].items():
-                            print(f"  - {pkg_name}{ver_spec}")
-                    
-                    # Print changed packages
-                    if 'changed_packages' in req_analysis and req_analysis['changed_packages']:
-                        print("\nChanged Dependencies:")
-                        for pkg_name, change in req_analysis['changed_packages'].items():
-                            print(f"  ~ {pkg_name}: {change['old']} -> {change['new']}")
+            if req_future is None:
+                print("requirements.txt is unchanged; skipping dependency analysis.")
+            else:
+                try:
+                    # Try to get a more detailed requirements analysis
+                    req_analysis = req_future.result()
                     
-                    # Print AI Analysis if available
-                    if 'ai_analysis' in req_analysis:
-                        ai_analysis = req_analysis['ai_analysis']
-                        print("\nAI-Powered Dependency Analysis:")
+                    if req_analysis and isinstance(req_analysis, dict) and req_analysis.get('status') != 'error':
+                        print("\nEnhanced Requirements Analysis:")
                         
-                        # Print risk assessment
-                        print("\nRisk Assessment:")
-                        for risk_level in ['high_risk', 'medium_risk', 'low_risk']:
-                            if ai_analysis['dependency_analysis']['risk_assessment'][risk_level]:
-                                print(f"\n{risk_level.replace('_', ' ').title()}:")
-                                for pkg in ai_analysis['dependency_analysis']['risk_assessment'][risk_level]:
-                                    print(f"  • {pkg['package']}: {pkg['analysis']}")
-                                    if pkg.get('recommendations'):
-                                        for rec in pkg['recommendations']:
-                                            print(f"    - {rec}")
+                        # Print summary
+                        if 'summary' in req_analysis:
+                            print(f"\nSummary: {req_analysis['summary']}")
                         
-                        # Print overall recommendations
-                        if ai_analysis['dependency_analysis']['recommendations']:
-                            print("\nOverall Recommendations:")
-                            for rec in ai_analysis['dependency_analysis']['recommendations']:
-                                print(f"  • {rec}")
-                else:
+                        # Print added packages
+                        if 'added_packages' in req_analysis and req_analysis['added_packages']:
+                            print("\nAdded Dependencies:\n" + "\n".join(
+                                f"  + {pkg_name}{ver_spec}" for pkg_name, ver_spec in req_analysis['added_packages'].items()))
+                        
+                        # Print removed packages
+                        if 'removed_packages' in req_analysis and req_analysis['removed_packages']:
+                            print("\nRemoved Dependencies:\n" + "\n".join(
+                                f"  - {pkg_name}{ver_spec}" for pkg_name, ver_spec in req_analysis['removed_packages'].items()))
+                        
+                        # Print changed packages
+                        if 'changed_packages' in req_analysis and req_analysis['changed_packages']:
+                            print("\nChanged Dependencies:\n" + "\n".join(
+                                f"  ~ {pkg_name}: {change['old']} -> {change['new']}"
+                                for pkg_name, change in req_analysis['changed_packages'].items()))
+                        
+                        # Print AI Analysis if available
+                        if 'ai_analysis' in req_analysis:
+                            ai_analysis = req_analysis['ai_analysis']
+                            print("\nAI-Powered Dependency Analysis:")
+                            
+                            # Print risk assessment
+                            print("\nRisk Assessment:")
+                            for risk_level in ['high_risk', 'medium_risk', 'low_risk']:
+                                if ai_analysis['dependency_analysis']['risk_assessment'][risk_level]:
+                                    print(f"\n{risk_level.replace('_', ' ').title()}:")
+                                    for pkg in ai_analysis['dependency_analysis']['risk_assessment'][risk_level]:
+                                        print(f"  • {pkg['package']}: {pkg['analysis']}")
+                                        if pkg.get('recommendations'):
+                                            for rec in pkg['recommendations']:
+                                                print(f"    - {rec}")
+                            
+                            # Print overall recommendations
+                            if ai_analysis['dependency_analysis']['recommendations']:
+                                print("\nOverall Recommendations:\n" + "\n".join(
+                                    f"  • {rec}" for rec in ai_analysis['dependency_analysis']['recommendations']))
+                    else:
+                        # Fallback to basic requirements comparison
+                        print("Enhanced requirements analysis not available. Using basic comparison...")
+                        check_requirements_basic(repo_url, compare_commit)
+                except Exception as e:
+                    print(f"Error during requirements analysis: {e}")
                     # Fallback to basic requirements comparison
-                    print("Enhanced requirements analysis not available. Using basic comparison...")
+                    print("Using basic requirements.txt comparison...")
                     check_requirements_basic(repo_url, compare_commit)
-            except Exception as e:
-                print(f"Error during requirements analysis: {e}")
-                # Fallback to basic requirements comparison
-                print("Using basic requirements.txt comparison...")
-                check_requirements_basic(repo_url, compare_commit)
             
             # Try to send the diff to the MCP server for AI analysis
                 
             # Get comprehensive analysis with next steps
             try:
                 print("\nPerforming comprehensive analysis with next steps...")
-                comprehensive_results = mcp.analyze_comprehensive(repo_url, compare_commit)
+                comprehensive_results = comprehensive_future.result()
                 
                 if comprehensive_results and isinstance(comprehensive_results, dict):
                     print("\nComprehensive Analysis:")
@@ -553,15 +957,13 @@ def test_git_diff(repo_url=None, compare_commit=None):
                     
                     # Print recommendations
                     if 'recommendations' in comprehensive_results:
-                        print("\nRecommendations:")
-                        for rec in comprehensive_results['recommendations']:
-                            print(f"  • {rec}")
+                        print("\nRecommendations:\n" + "\n".join(
+                            f"  • {rec}" for rec in comprehensive_results['recommendations']))
                     
                     # Print next steps
                     if 'next_steps' in comprehensive_results:
-                        print("\nNext Steps:")
-                        for step in comprehensive_results['next_steps']:
-                            print(f"  → {step}")
+                        print("\nNext Steps:\n" + "\n".join(
+                            f"  → {step}" for step in comprehensive_results['next_steps']))
                 else:
                     print("Comprehensive analysis not available or returned empty results.")
             except Exception as e:
@@ -574,51 +976,47 @@ def test_git_diff(repo_url=None, compare_commit=None):
         print("Showing the latest commit information instead.")
         
         try:
-            # Create a temporary directory
-            temp_dir = tempfile.mkdtemp()
-            
-            # Clone the repository
-            subprocess.run(
-                ["git", "clone", "--depth", "1", repo_url, temp_dir],
-                check=True,
-                capture_output=True
-            )
-            
-            # Get latest commit info
-            result = subprocess.run(
-                ["git", "log", "-1", "--pretty=format:%h|%an|%ad|%s"],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
+            with contextlib.ExitStack() as stack:
+                if has_clone(repo_url):
+                    repo_dir = ensure_bare_clone(repo_url)
+                else:
+                    # Only the tip commit is needed, so a shallow single-branch clone is
+                    # enough and stays small even if the server ignores --filter
+                    repo_dir = stack.enter_context(tempfile.TemporaryDirectory())
+                    subprocess.run(
+                        ["git", "clone", "--bare", "--depth=1", "--single-branch", "--no-tags",
+                         "--filter=blob:none", repo_url, repo_dir],
+                        check=True,
+                        capture_output=True
+                    )
+                
+                # Get latest commit info
+                result = subprocess.run(
+                    ["git", "-C", repo_dir, "log", "-1", "--pretty=format:%h|%an|%ad|%s"],
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
             
             commit_parts = result.stdout.split('|')
             if len(commit_parts) >= 4:
-                print("\nLatest Commit:")
-                print(f"SHA: {commit_parts[0]}")
-                print(f"Author: {commit_parts[1]}")
-                print(f"Date: {commit_parts[2]}")
-                print(f"Message: {commit_parts[3]}")
-                print("\nUse this commit SHA to compare with an earlier version.")
-            
-            # Clean up
-            import shutil
-            shutil.rmtree(temp_dir)
+                print(f"\nLatest Commit:\n"
+                      f"SHA: {commit_parts[0]}\n"
+                      f"Author: {commit_parts[1]}\n"
+                      f"Date: {commit_parts[2]}\n"
+                      f"Message: {commit_parts[3]}\n"
+                      f"\nUse this commit SHA to compare with an earlier version.")
         except Exception as e:
             print(f"Error getting latest commit info: {e}")
 
 def check_requirements_basic(repo_url, compare_commit, target_commit='HEAD'):
     """Basic requirements.txt analysis using the legacy compare_requirements function"""
     print("\nChecking for requirements.txt changes...")
-    old_requirements = get_file_from_commit(repo_url, compare_commit, "requirements.txt")
+    old_requirements, new_requirements = get_file_pair(repo_url, compare_commit, target_commit, "requirements.txt")
     
     if old_requirements is not None:
         print("Found requirements.txt in the base commit.")
         
-        # Get current requirements.txt
-        new_requirements = get_file_from_commit(repo_url, target_commit, "requirements.txt")
-        
         if new_requirements is not None:
             print("Found requirements.txt in the current commit.")
             
@@ -629,19 +1027,13 @@ def check_requirements_basic(repo_url, compare_commit, target_commit='HEAD'):
                 print("\nRequirements Changes:")
                 
                 if added:
-                    print("\nAdded Dependencies:")
-                    for dep in added:
-                        print(f"  + {dep}")
+                    print("\nAdded Dependencies:\n" + "\n".join(f"  + {dep}" for dep in added))
                 
                 if removed:
-                    print("\nRemoved Dependencies:")
-                    for dep in removed:
-                        print(f"  - {dep}")
+                    print("\nRemoved Dependencies:\n" + "\n".join(f"  - {dep}" for dep in removed))
                 
                 if changed:
-                    print("\nChanged Dependencies:")
-                    for dep in changed:
-                        print(f"  ~ {dep}")
+                    print("\nChanged Dependencies:\n" + "\n".join(f"  ~ {dep}" for dep in changed))
             else:
                 print("No changes to requirements.txt dependencies.")
         else:
@@ -654,7 +1046,11 @@ if __name__ == "__main__":
     parser.add_argument("repo_url", nargs="?", help="URL of the Git repository")
     parser.add_argument("commit_sha", nargs="?", help="Base commit SHA to compare against")
     parser.add_argument("--comprehensive", action="store_true", help="Get comprehensive analysis with next steps")
+    parser.add_argument("--no-cache", action="store_true", help="Don't reuse or keep cached clones and file contents")
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        CACHE_DIR = make_temporary_cache_dir("mcp_git_diff_")
+    
     test_git_diff(args.repo_url, args.commit_sha) 
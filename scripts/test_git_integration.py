@@ -1,13 +1,225 @@
 import os
+import re
+import argparse
 import requests
 import json
-from typing import Dict, Any, Optional, List, Union
+import time
+import hashlib
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterable
 import sys
 import tempfile
 import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def analyze_repo(repo_url: str, base_url: str = "http://localhost:8000", capture_output: bool = False) -> Dict[str, Any]:
+from script_utils import (format_json, get_env_int, get_session, make_temporary_cache_dir,
+                          normalize_repo_url, write_file_atomic)
+
+# Extensions that identify a repository's primary language
+LANGUAGE_EXTENSIONS = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".ts": "TypeScript",
+    ".java": "Java",
+    ".c": "C",
+    ".cpp": "C++",
+    ".cs": "C#",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".rb": "Ruby",
+    ".php": "PHP",
+    ".html": "HTML",
+    ".css": "CSS",
+    ".sh": "Shell",
+    ".md": "Markdown"
+}
+
+# Dependency, build and tool directories that are sometimes committed but say
+# nothing about the repository's own code
+SKIPPED_DIRECTORIES = frozenset({
+    "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache", ".pytest_cache",
+    "target", "build", "dist", ".tox", ".idea", ".vscode"
+})
+
+# "https://github.com/owner/repo" and "git@github.com:owner/repo" style URLs
+GITHUB_URL_PATTERN = re.compile(
+    r'^(?:https?://(?:www\.)?github\.com/|git@github\.com:)([^/]+)/([^/]+?)(?:\.git)?/?$',
+    re.IGNORECASE
+)
+
+# Analyses of a repository's HEAD, reused until HEAD moves or the entry expires
+CACHE_DIR = os.environ.get('MCP_GIT_ANALYSIS_CACHE_DIR',
+                           os.path.join(os.path.expanduser("~"), ".cache", "mcp_git_analysis"))
+CACHE_TTL = get_env_int('MCP_GIT_ANALYSIS_CACHE_TTL', 86400)
+
+def fetch_github_listing(repo_url: str, session: requests.Session) -> Optional[Tuple[List[Dict[str, str]], List[str]]]:
+    """
+    Get the last commit and file paths of a GitHub repository's default branch
+    through the REST API, without cloning it.
+    
+    Returns:
+        Tuple of (commit history with just the last commit, file paths), or None if the repository isn't on GitHub or the API
+        can't give a complete answer (rate limit, private repository, truncated tree)
+    """
+    match = GITHUB_URL_PATTERN.match(repo_url.strip())
+    if not match:
+        return None
+    api_url = f"https://api.github.com/repos/{match.group(1)}/{match.group(2)}"
+    
+    try:
+        commits_response = session.get(f"{api_url}/commits", params={"per_page": 1}, timeout=10)
+        if commits_response.status_code != 200:
+            return None
+        commit = commits_response.json()[0]
+        
+        tree_response = session.get(f"{api_url}/git/trees/{commit['commit']['tree']['sha']}",
+                                    params={"recursive": 1}, timeout=10)
+        if tree_response.status_code != 200:
+            return None
+        tree = tree_response.json()
+        
+        # A truncated listing would undercount the files
+        if tree.get("truncated"):
+            return None
+        
+        # Match 'git log --pretty=format:%h|%an|%ad|%s' output; the API reports dates in UTC
+        author = commit["commit"]["author"]
+        date = datetime.fromisoformat(author["date"])
+        last_commit = {
+            "hash": commit["sha"][:7],
+            "author": author["name"],
+            "date": f"{date:%a %b} {date.day} {date:%H:%M:%S %Y} +0000",
+            "message": commit["commit"]["message"].split("\n", 1)[0]
+        }
+        
+        # Submodules are "commit" entries and, as in a clone, not counted
+        paths = [entry["path"] for entry in tree["tree"] if entry["type"] == "blob"]
+    except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+        return None
+    
+    return [last_commit], paths
+
+def get_remote_head(repo_url: str) -> Optional[str]:
+    """Get the commit SHA the remote's HEAD points at, or None if it can't be listed"""
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", repo_url, "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    return result.stdout.split()[0]
+
+def get_cache_path(repo_url: str) -> str:
+    """Get the cache file holding the last analysis of a repository"""
+    return os.path.join(CACHE_DIR, hashlib.sha256(normalize_repo_url(repo_url).encode()).hexdigest() + ".json")
+
+def read_cached_analysis(repo_url: str, head_sha: str, skipped_directories: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read a cached analysis of a repository.
+    
+    Returns:
+        Dict with repository_info and commit_history, or None if there is no
+        entry for this HEAD and these skipped directories younger than CACHE_TTL seconds
+    """
+    path = get_cache_path(repo_url)
+    try:
+        if time.time() - os.path.getmtime(path) >= CACHE_TTL:
+            return None
+        with open(path, "rb") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("head") != head_sha or cached.get("skipped_directories") != skipped_directories:
+        return None
+    return cached
+
+def write_cached_analysis(repo_url: str, head_sha: str, skipped_directories: List[str],
+                          repo_info: Dict[str, Any], commit_history: List[Dict[str, str]]):
+    """Store the analysis of a repository's HEAD, replacing the cache file atomically"""
+    entry = {"head": head_sha, "skipped_directories": skipped_directories,
+             "repository_info": repo_info, "commit_history": commit_history}
+    try:
+        write_file_atomic(get_cache_path(repo_url), json.dumps(entry).encode())
+    except OSError as e:
+        print(f"Warning: Could not write analysis cache entry: {e}")
+
+def list_tree_files(repo_dir: str, revision: str = "HEAD") -> List[str]:
+    """
+    List the paths of all files in a commit's tree without checking anything out.
+    
+    Submodules are left out, as they contain no files in a fresh checkout.
+    
+    Returns:
+        File paths relative to the repository root
+    """
+    result = subprocess.run(
+        ["git", "-C", repo_dir, "ls-tree", "-r", "-z", revision],
+        check=True,
+        capture_output=True
+    )
+    paths = []
+    # Each entry is "<mode> <type> <object>\t<path>"
+    for entry in result.stdout.decode('utf-8', errors='replace').split("\0"):
+        info, _, path = entry.partition("\t")
+        if info.split(" ")[1:2] == ["blob"]:
+            paths.append(path)
+    return paths
+
+def request_server_analysis(repo_url: str, base_url: str, session: requests.Session) -> List[Tuple[str, Any]]:
+    """
+    Ask the MCP server to analyze a repository, if it is available.
+    
+    Returns:
+        (key, value) results for analyze_repo to log, in order
+    """
+    entries = []
+    
+    def log_result(key: str, value: Any):
+        entries.append((key, value))
+    
+    try:
+        # First check if the server is responding at all
+        try:
+            models_response = session.get(f"{base_url}/v1/models", timeout=5)
+            if models_response.status_code != 200:
+                log_result("server_connection_error", 
+                          f"MCP server returned status {models_response.status_code}")
+                raise Exception(f"MCP server returned status {models_response.status_code}")
+        except requests.RequestException as e:
+            log_result("server_connection_error", f"Failed to connect to MCP server: {str(e)}")
+            raise e
+            
+        # Test repository analysis through MCP API
+        analyze_payload = {"repo_url": repo_url}
+        try:
+            response = session.post(f"{base_url}/v1/git/analyze", json=analyze_payload, timeout=10)
+            
+            if response.status_code == 200:
+                server_analysis = response.json()
+                log_result("server_analysis", server_analysis)
+            elif response.status_code == 404:
+                # Endpoint doesn't exist - handle gracefully
+                log_result("server_analysis_status", "Git analysis endpoint not available (404)")
+                log_result("server_analysis_error", "The /v1/git/analyze endpoint is not implemented in this MCP server version")
+            else:
+                log_result("server_analysis_error", 
+                          f"Error: {response.status_code} - {response.text}")
+        except requests.RequestException as e:
+            log_result("server_analysis_error", f"Request failed: {str(e)}")
+    except Exception as e:
+        log_result("server_connection_error", str(e))
+    
+    return entries
+
+def analyze_repo(repo_url: str, base_url: str = "http://localhost:8000", capture_output: bool = False,
+                 session: Optional[requests.Session] = None,
+                 skipped_directories: Iterable[str] = SKIPPED_DIRECTORIES) -> Dict[str, Any]:
     """
     Analyze a Git repository and return useful information about it.
     
@@ -15,124 +227,138 @@ def analyze_repo(repo_url: str, base_url: str = "http://localhost:8000", capture
         repo_url: URL of the Git repository to analyze
         base_url: URL of the MCP server
         capture_output: If True, capture and return the output instead of printing
+        session: HTTP session for the GitHub and MCP server requests (default: a shared pooled session)
+        skipped_directories: Directory names whose files aren't counted (default:
+            SKIPPED_DIRECTORIES); pass an empty collection to count every file
         
     Returns:
         Dict containing repository analysis information
     """
     results = {}
+    session = session or get_session()
     
-    # Helper function to log or print results
-    def log_result(key: str, value: Any):
-        if capture_output:
+    # Helper function to log or print results, chosen once for the whole analysis
+    if capture_output:
+        def log_result(key: str, value: Any):
             results[key] = value
-        else:
-            print(f"\n=== {key} ===")
+    else:
+        def log_result(key: str, value: Any):
             if isinstance(value, (dict, list)):
-                print(json.dumps(value, indent=2))
-            else:
-                print(value)
+                value = format_json(value)
+            print(f"\n=== {key} ===\n{value}")
     
-    # Clone repo to temporary directory
     try:
-        temp_dir = tempfile.mkdtemp(prefix="mcp_git_analysis_")
-        log_result("temporary_directory", temp_dir)
-        
-        # Clone the repository
-        clone_start = datetime.now()
-        log_result("cloning_repo", f"Cloning {repo_url} into {temp_dir}")
+        # The MCP server analyzes the repository on its own, so ask it right away
+        # and collect its answer once the local analysis is done
+        executor = ThreadPoolExecutor(max_workers=1)
+        server_future = executor.submit(request_server_analysis, repo_url, base_url, session)
+        executor.shutdown(wait=False)
         
-        subprocess.run(["git", "clone", "--depth", "1", repo_url, temp_dir], 
-                      check=True, capture_output=True)
+        temp = None
+        commit_history_error = None
         
-        clone_duration = (datetime.now() - clone_start).total_seconds()
-        log_result("clone_duration_seconds", clone_duration)
-        
-        # Get basic repository info
-        repo_info = {}
-        
-        # Get commit count (approximate with depth=1)
-        try:
-            commit_count_cmd = subprocess.run(
-                ["git", "rev-list", "--count", "HEAD"],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            repo_info["commit_count"] = int(commit_count_cmd.stdout.strip())
-        except (subprocess.SubprocessError, ValueError):
-            repo_info["commit_count"] = "unknown"
-        
-        # Get last commit info
-        try:
-            last_commit_cmd = subprocess.run(
-                ["git", "log", "-1", "--pretty=format:%h|%an|%ad|%s"],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            commit_parts = last_commit_cmd.stdout.split("|")
-            repo_info["last_commit"] = {
-                "hash": commit_parts[0],
-                "author": commit_parts[1],
-                "date": commit_parts[2],
-                "message": commit_parts[3] if len(commit_parts) > 3 else ""
-            }
-        except subprocess.SubprocessError:
-            repo_info["last_commit"] = "unknown"
-        
-        # Get file types and count
-        file_types = {}
-        try:
-            for root, _, files in os.walk(temp_dir):
-                if ".git" in root:
-                    continue
+        # An analysis of the same remote HEAD is reused without listing the repository again
+        head_sha = get_remote_head(repo_url)
+        skipped_directories = frozenset(skipped_directories)
+        cache_skipped = sorted(skipped_directories)
+        cached = read_cached_analysis(repo_url, head_sha, cache_skipped) if head_sha else None
+        if cached is not None:
+            repo_info, commit_history = cached["repository_info"], cached["commit_history"]
+            log_result("repository_source", f"Cached analysis of {head_sha[:7]}")
+        else:
+            # GitHub repositories can be listed through the REST API without a clone
+            listing = fetch_github_listing(repo_url, session)
+            if listing is not None:
+                commit_history, file_paths = listing
+                log_result("repository_source", "GitHub REST API")
+            else:
+                # Clone repo to temporary directory; if anything below fails, the
+                # directory is removed when this object is collected
+                temp = tempfile.TemporaryDirectory(prefix="mcp_git_analysis_")
+                temp_dir = temp.name
+                log_result("temporary_directory", temp_dir)
+                
+                # Clone the repository
+                clone_start = time.perf_counter()
+                log_result("cloning_repo", f"Cloning {repo_url} into {temp_dir}")
+                
+                # Only the tip commit's file names are needed: skip blobs and the checkout.
+                # Nothing reads clone's stdout; stderr is kept for error reports
+                subprocess.run(["git", "clone", "--filter=blob:none", "--no-checkout", "--depth", "1",
+                                "--single-branch", repo_url, temp_dir],
+                              check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                
+                clone_duration = time.perf_counter() - clone_start
+                log_result("clone_duration_seconds", clone_duration)
+                
+                # One git log gives the recent commits, the last commit and the commit
+                # count; with --depth 1 the clone has fewer than 5 commits, so the
+                # count is exactly what 'git rev-list --count HEAD' would report
+                commit_history = None
+                try:
+                    commit_history_cmd = subprocess.run(
+                        ["git", "-C", temp_dir, "log", "--pretty=format:%h|%an|%ad|%s", "-n", "5"],
+                        check=True,
+                        capture_output=True,
+                        text=True
+                    )
                     
-                for file in files:
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext:
-                        file_types[ext] = file_types.get(ext, 0) + 1
-                    else:
-                        file_types["no_extension"] = file_types.get("no_extension", 0) + 1
-            
-            # Sort by count
-            file_types = {k: v for k, v in sorted(file_types.items(), 
-                                                 key=lambda item: item[1], reverse=True)}
-            repo_info["file_types"] = file_types
-            repo_info["file_count"] = sum(file_types.values())
+                    commit_history = []
+                    for line in commit_history_cmd.stdout.strip().split('\n'):
+                        if line:
+                            parts = line.split('|')
+                            commit_history.append({
+                                "hash": parts[0],
+                                "author": parts[1],
+                                "date": parts[2],
+                                "message": parts[3] if len(parts) > 3 else ""
+                            })
+                except Exception as e:
+                    commit_history_error = str(e)
+                
+                file_paths = None
             
-            # Determine primary language
-            lang_map = {
-                ".py": "Python",
-                ".js": "JavaScript",
-                ".ts": "TypeScript",
-                ".java": "Java",
-                ".c": "C",
-                ".cpp": "C++",
-                ".cs": "C#",
-                ".go": "Go",
-                ".rs": "Rust",
-                ".rb": "Ruby",
-                ".php": "PHP",
-                ".html": "HTML",
-                ".css": "CSS",
-                ".sh": "Shell",
-                ".md": "Markdown"
-            }
+            # Get basic repository info
+            repo_info = {}
             
-            # Find the most common extension that maps to a language
-            primary_lang = "Unknown"
-            for ext, count in file_types.items():
-                if ext in lang_map:
-                    primary_lang = lang_map[ext]
-                    break
+            if commit_history:
+                repo_info["commit_count"] = len(commit_history)
+                repo_info["last_commit"] = commit_history[0]
+            else:
+                repo_info["commit_count"] = "unknown"
+                repo_info["last_commit"] = "unknown"
             
-            repo_info["primary_language"] = primary_lang
+            # Get file types and count
+            try:
+                extensions = []
+                for path in file_paths if file_paths is not None else list_tree_files(temp_dir):
+                    directory, _, file = path.rpartition("/")
+                    if directory and not skipped_directories.isdisjoint(directory.split("/")):
+                        continue
+                    # Same result as os.path.splitext: leading dots don't start an extension
+                    head, dot, ext = file.rpartition(".")
+                    extensions.append("." + ext.lower() if dot and head.lstrip(".") else "no_extension")
+                file_types = Counter(extensions)
+                
+                # Sort by count
+                file_types = dict(file_types.most_common())
+                repo_info["file_types"] = file_types
+                repo_info["file_count"] = sum(file_types.values())
+                
+                # Determine primary language: file_types is sorted by count, so the
+                # first extension that maps to a language is the most common one
+                primary_lang = next((LANGUAGE_EXTENSIONS[ext] for ext in file_types if ext in LANGUAGE_EXTENSIONS),
+                                    "Unknown")
+                
+                repo_info["primary_language"] = primary_lang
+                
+            except Exception as e:
+                repo_info["file_count"] = "error"
+                repo_info["error"] = str(e)
             
-        except Exception as e:
-            repo_info["file_count"] = "error"
-            repo_info["error"] = str(e)
+            # Only complete analyses are cached
+            if head_sha and commit_history and repo_info["file_count"] != "error":
+                write_cached_analysis(repo_url, head_sha, cache_skipped, repo_info, commit_history)
         
         log_result("repository_info", repo_info)
         
@@ -141,72 +367,22 @@ def analyze_repo(repo_url: str, base_url: str = "http://localhost:8000", capture
         results["timestamp"] = datetime.now().isoformat()
         
         # Enhance with commit history
-        try:
-            # Get recent commits (limited to avoid excessive data)
-            commit_history_cmd = subprocess.run(
-                ["git", "log", "--pretty=format:%h|%an|%ad|%s", "-n", "5"],
-                cwd=temp_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            commit_history = []
-            for line in commit_history_cmd.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split('|')
-                    commit_history.append({
-                        "hash": parts[0],
-                        "author": parts[1],
-                        "date": parts[2],
-                        "message": parts[3] if len(parts) > 3 else ""
-                    })
-            
-            if commit_history:
-                results["commit_history"] = commit_history
-        except Exception as e:
-            log_result("commit_history_error", str(e))
+        if commit_history:
+            results["commit_history"] = commit_history
+        elif commit_history_error is not None:
+            log_result("commit_history_error", commit_history_error)
         
-        # Also try server-side analysis if the MCP server is available
-        try:
-            # First check if the server is responding at all
-            try:
-                models_response = requests.get(f"{base_url}/v1/models", timeout=5)
-                if models_response.status_code != 200:
-                    log_result("server_connection_error", 
-                              f"MCP server returned status {models_response.status_code}")
-                    raise Exception(f"MCP server returned status {models_response.status_code}")
-            except requests.RequestException as e:
-                log_result("server_connection_error", f"Failed to connect to MCP server: {str(e)}")
-                raise e
-                
-            # Test repository analysis through MCP API
-            analyze_payload = {"repo_url": repo_url}
-            try:
-                response = requests.post(f"{base_url}/v1/git/analyze", json=analyze_payload, timeout=10)
-                
-                if response.status_code == 200:
-                    server_analysis = response.json()
-                    log_result("server_analysis", server_analysis)
-                elif response.status_code == 404:
-                    # Endpoint doesn't exist - handle gracefully
-                    log_result("server_analysis_status", "Git analysis endpoint not available (404)")
-                    log_result("server_analysis_error", "The /v1/git/analyze endpoint is not implemented in this MCP server version")
-                else:
-                    log_result("server_analysis_error", 
-                              f"Error: {response.status_code} - {response.text}")
-            except requests.RequestException as e:
-                log_result("server_analysis_error", f"Request failed: {str(e)}")
-        except Exception as e:
-            log_result("server_connection_error", str(e))
+        # Add the server-side analysis requested at the start
+        for key, value in server_future.result():
+            log_result(key, value)
         
         # Clean up
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-            log_result("cleanup", "Removed temporary directory")
-        except Exception as e:
-            log_result("cleanup_error", str(e))
+        if temp is not None:
+            try:
+                temp.cleanup()
+                log_result("cleanup", "Removed temporary directory")
+            except Exception as e:
+                log_result("cleanup_error", str(e))
     
     except Exception as e:
         log_result("error", str(e))
@@ -221,13 +397,9 @@ def test_git_integration(base_url: str = "http://localhost:8000", repo_url: str
     """Test the Git integration in the MCP server"""
     
     if not repo_url:
-        # If no repo_url is provided as an argument, check if it was passed from CLI
-        if len(sys.argv) > 1:
-            repo_url = sys.argv[1]
-        else:
-            print("Error: Please provide a Git repository URL")
-            print("Usage: python test_git_integration.py <git-repo-url>")
-            sys.exit(1)
+        print("Error: Please provide a Git repository URL")
+        print("Usage: python test_git_integration.py <git-repo-url>")
+        sys.exit(1)
     
     print(f"Testing Git integration with repository: {repo_url}")
     print(f"MCP server: {base_url}")
@@ -238,4 +410,14 @@ def test_git_integration(base_url: str = "http://localhost:8000", repo_url: str
     print("\nGit integration test completed.")
 
 if __name__ == "__main__":
-    test_git_integration() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Test the Git integration in the MCP server")
+    parser.add_argument("repo_url", nargs="?", help="URL of the Git repository")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Base URL of the MCP server")
+    parser.add_argument("--no-cache", action="store_true", help="Don't reuse or keep cached repository analyses")
+    
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        CACHE_DIR = make_temporary_cache_dir("mcp_git_analysis_cache_")
+    
+    test_git_integration(args.base_url, args.repo_url) 
\ No newline at end of file
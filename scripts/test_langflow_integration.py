@@ -1,5 +1,7 @@
 import os
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from langflow import MCPAIComponent
 
 def test_langflow_integration(repo_url=None):
@@ -8,9 +10,26 @@ def test_langflow_integration(repo_url=None):
     print("Initializing MCPAIComponent...")
     mcp = MCPAIComponent(mcp_server_url="http://localhost:8000")
     
+    # The model list, the first chat and the repository analysis don't depend on
+    # each other, so send all three requests now and print the results in order
+    executor = ThreadPoolExecutor(max_workers=3)
+    models_future = executor.submit(mcp.list_models)
+    chat_future = executor.submit(
+        mcp.chat,
+        model_id="openai-gpt-chat",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant with expertise in programming."},
+            {"role": "user", "content": "Explain the concept of Model Control Plane (MCP) in 2-3 sentences."}
+        ],
+        max_tokens=150,
+        temperature=0.7
+    )
+    repo_future = executor.submit(mcp.analyze_git_repo, repo_url) if repo_url else None
+    executor.shutdown(wait=False)
+    
     # List available models
     print("\nAvailable models:")
-    models = mcp.list_models()
+    models = models_future.result()
     for model in models:
         capabilities = ', '.join(model.get('capabilities', []))
         print(f"- {model.get('id')}: {model.get('name')} (Capabilities: {capabilities})")
@@ -18,15 +37,7 @@ def test_langflow_integration(repo_url=None):
     # Test chat functionality with OpenAI
     print("\nTesting chat functionality with OpenAI model...")
     try:
-        chat_response = mcp.chat(
-            model_id="openai-gpt-chat",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant with expertise in programming."},
-                {"role": "user", "content": "Explain the concept of Model Control Plane (MCP) in 2-3 sentences."}
-            ],
-            max_tokens=150,
-            temperature=0.7
-        )
+        chat_response = chat_future.result()
         
         # Extract and print the assistant's response
         choices = chat_response.get('choices', [])
@@ -44,7 +55,7 @@ def test_langflow_integration(repo_url=None):
         print(f"\nAnalyzing Git repository: {repo_url}")
         try:
             # Analyze the repository
-            repo_analysis = mcp.analyze_git_repo(repo_url)
+            repo_analysis = repo_future.result()
             
             # Print some basic repository information
             print(f"Repository URL: {repo_analysis.get('url')}")
@@ -96,10 +107,9 @@ def test_langflow_integration(repo_url=None):
     print("\nLangflow integration test complete!")
 
 if __name__ == "__main__":
-    import sys
+    parser = argparse.ArgumentParser(description="Test the MCP AI component in Langflow")
+    parser.add_argument("repo_url", nargs="?", help="Optional URL of a Git repository to analyze")
     
-    repo_url = None
-    if len(sys.argv) > 1:
-        repo_url = sys.argv[1]
+    args = parser.parse_args()
     
-    test_langflow_integration(repo_url) 
\ No newline at end of file
+    test_langflow_integration(args.repo_url) 
\ No newline at end of file
@@ -8,9 +8,45 @@ import sys
 import json
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from langflow import MCPAIComponent
 
+# Reciprocals of the byte units used in the reports; both are powers of two,
+# so multiplying by them gives exactly the same result as dividing
+INV_MB = 1.0 / (1024 * 1024)
+INV_GB = 1.0 / (1024 * 1024 * 1024)
+
+# Alert names containing any of these are treated as memory-related
+MEMORY_ALERT_TERMS = ('memory', 'mem', 'swap', 'container')
+
+# Recommended action for a firing node memory alert, by the first term found in its name
+NODE_ALERT_ACTIONS = {
+    'high': "Consider freeing up memory or increasing capacity",
+    'critical': "Immediately free up memory, potential system instability",
+    'medium': "Monitor memory usage trends",
+    'low': "Normal operations, no action needed",
+    'swap': "Increase swap space or reduce memory pressure",
+}
+
+# Instant query results younger than this many seconds are reused
+QUERY_CACHE_TTL = 30
+
+# (MCP server URL, Prometheus URL, query) -> (monotonic fetch time, result)
+_query_cache = {}
+
+def cached_prometheus_query(mcp, query):
+    """Run an instant query, reusing a result fetched less than QUERY_CACHE_TTL seconds ago"""
+    key = (mcp.mcp_server_url, os.environ.get("PROMETHEUS_URL"), query)
+    cached = _query_cache.get(key)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < QUERY_CACHE_TTL:
+        return cached[1]
+    
+    result = mcp.prometheus_query(query)
+    _query_cache[key] = (now, result)
+    return result
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="Test Prometheus integration with MCP")
@@ -39,10 +75,37 @@ def test_prometheus(prometheus_url=None, quiet=False):
     # Set the PROMETHEUS_URL environment variable for the server
     os.environ["PROMETHEUS_URL"] = prometheus_url
     
+    # Calculate time range for the last 15 minutes
+    end_time = datetime.now()
+    start_time = end_time - timedelta(minutes=15)
+    
+    # Format timestamps for Prometheus
+    end_str = end_time.isoformat("T") + "Z"
+    start_str = start_time.isoformat("T") + "Z"
+    
+    # The sections below only depend on these queries, so send them all at once
+    # and let each section wait for the results it prints. Queries shared by
+    # several sections are only sent once.
+    memory_usage_query = "(1 - node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes) * 100"
+    executor = ThreadPoolExecutor(max_workers=6)
+    up_future = executor.submit(cached_prometheus_query, mcp, "up")
+    mem_usage_pct_future = executor.submit(cached_prometheus_query, mcp, memory_usage_query)
+    mem_total_future = executor.submit(cached_prometheus_query, mcp, "node_memory_MemTotal_bytes")
+    mem_range_future = executor.submit(
+        mcp.prometheus_query_range,
+        query=memory_usage_query,
+        start=start_str,
+        end=end_str,
+        step="60s"  # 1-minute intervals
+    )
+    alerts_future = executor.submit(mcp.prometheus_get_alerts)
+    mem_available_future = executor.submit(cached_prometheus_query, mcp, "node_memory_MemAvailable_bytes")
+    executor.shutdown(wait=False)
+    
     # Basic query test
     print("\n1. Testing basic Prometheus query...")
     try:
-        query_result = mcp.prometheus_query("up")
+        query_result = up_future.result()
         print(f"Query status: {query_result.get('status')}")
         data = query_result.get('data', {})
         result_type = data.get('resultType')
@@ -64,8 +127,8 @@ def test_prometheus(prometheus_url=None, quiet=False):
     # Current memory usage percentage
     try:
         print("\n2.1 Current memory usage percentage:")
-        query = "(1 - node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes) * 100"
-        query_result = mcp.prometheus_query(query)
+        query = memory_usage_query
+        query_result = mem_usage_pct_future.result()
         
         print(f"Query: {query}")
         print(f"Status: {query_result.get('status')}")
@@ -102,8 +165,7 @@ def test_prometheus(prometheus_url=None, quiet=False):
     # Total memory capacity
     try:
         print("\n2.2 Total memory capacity:")
-        query = "node_memory_MemTotal_bytes"
-        query_result = mcp.prometheus_query(query)
+        query_result = mem_total_future.result()
         
         data = query_result.get('data', {})
         results = data.get('result', [])
@@ -113,7 +175,7 @@ def test_prometheus(prometheus_url=None, quiet=False):
                 print(f"  Host {i+1}: {result.get('metric', {}).get('instance', 'unknown')}")
                 try:
                     bytes_value = float(result.get('value', [0, 0])[1])
-                    gb_value = bytes_value / (1024 * 1024 * 1024)
+                    gb_value = bytes_value * INV_GB
                     print(f"    Total Memory: {gb_value:.2f} GB")
                 except (ValueError, TypeError, IndexError):
                     print("    Unable to parse value")
@@ -125,22 +187,9 @@ def test_prometheus(prometheus_url=None, quiet=False):
     # Memory usage over time
     print("\n2.3 Memory usage over time (last 15 minutes):")
     try:
-        # Calculate time range for the last 15 minutes
-        end_time = datetime.now()
-        start_time = end_time - timedelta(minutes=15)
-        
-        # Format timestamps for Prometheus
-        end_str = end_time.isoformat("T") + "Z"
-        start_str = start_time.isoformat("T") + "Z"
-        
         # Query for memory usage percentage over time
-        query = "(1 - node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes) * 100"
-        range_result = mcp.prometheus_query_range(
-            query=query,
-            start=start_str,
-            end=end_str,
-            step="60s"  # 1-minute intervals
-        )
+        query = memory_usage_query
+        range_result = mem_range_future.result()
         
         print(f"Query: {query}")
         print(f"Status: {range_result.get('status')}")
@@ -193,35 +242,34 @@ def test_prometheus(prometheus_url=None, quiet=False):
     print("\n3. Checking memory alerts...")
     try:
         # First check if there are any active memory alerts
-        alerts_result = mcp.prometheus_get_alerts()
+        alerts_result = alerts_future.result()
         
         data = alerts_result.get('data', {})
         all_alerts = data.get('alerts', [])
         
-        # Filter for memory-related alerts - including both node and container alerts
-        memory_alerts = [
-            alert for alert in all_alerts 
-            if 'alertname' in alert.get('labels', {}) and 
-            any(memory_term in alert.get('labels', {}).get('alertname', '').lower() 
-                for memory_term in ['memory', 'mem', 'swap', 'container'])
-        ]
-        
-        print(f"Found {len(memory_alerts)} memory-related alerts out of {len(all_alerts)} total alerts")
+        # Filter for memory-related alerts and group them by type in one pass
+        node_memory_alerts = []
+        container_memory_alerts = []
         
-        if memory_alerts:
-            # Group alerts by type
-            node_memory_alerts = []
-            container_memory_alerts = []
+        for alert in all_alerts:
+            labels = alert.get('labels', {})
+            if 'alertname' not in labels:
+                continue
             
-            for alert in memory_alerts:
-                alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                
-                # Check if this is a container alert
-                if 'container' in alert_name.lower() or 'name' in alert.get('labels', {}):
-                    container_memory_alerts.append(alert)
-                else:
-                    node_memory_alerts.append(alert)
+            alert_name_lc = labels['alertname'].lower()
+            if not any(memory_term in alert_name_lc for memory_term in MEMORY_ALERT_TERMS):
+                continue
             
+            # Check if this is a container alert
+            if 'container' in alert_name_lc or 'name' in labels:
+                container_memory_alerts.append(alert)
+            else:
+                node_memory_alerts.append(alert)
+        
+        memory_alert_count = len(node_memory_alerts) + len(container_memory_alerts)
+        print(f"Found {memory_alert_count} memory-related alerts out of {len(all_alerts)} total alerts")
+        
+        if memory_alert_count:
             # Get AI recommendations for alerts - ALWAYS show AI recommendations regardless of quiet mode
             if node_memory_alerts or container_memory_alerts:
                 ai_recommendations = get_ai_recommendations(mcp, node_memory_alerts, container_memory_alerts)
@@ -236,10 +284,11 @@ def test_prometheus(prometheus_url=None, quiet=False):
                 if node_memory_alerts:
                     print("\n  Node Memory Alerts:")
                     for i, alert in enumerate(node_memory_alerts):
-                        alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                        severity = alert.get('labels', {}).get('severity', 'unknown')
+                        labels = alert.get('labels', {})
+                        alert_name = labels.get('alertname', 'Unknown')
+                        severity = labels.get('severity', 'unknown')
                         state = alert.get('state', 'unknown')
-                        instance = alert.get('labels', {}).get('instance', 'unknown')
+                        instance = labels.get('instance', 'unknown')
                         summary = alert.get('annotations', {}).get('summary', 'No summary available')
                         
                         print(f"  Alert {i+1}: {alert_name}")
@@ -250,28 +299,23 @@ def test_prometheus(prometheus_url=None, quiet=False):
                         
                         # For firing alerts, recommend actions
                         if state.lower() == 'firing':
-                            if 'high' in alert_name.lower():
-                                print("    Recommended action: Consider freeing up memory or increasing capacity")
-                            elif 'critical' in alert_name.lower():
-                                print("    Recommended action: Immediately free up memory, potential system instability")
-                            elif 'medium' in alert_name.lower():
-                                print("    Recommended action: Monitor memory usage trends")
-                            elif 'low' in alert_name.lower():
-                                print("    Recommended action: Normal operations, no action needed")
-                            elif 'swap' in alert_name.lower():
-                                print("    Recommended action: Increase swap space or reduce memory pressure")
+                            alert_name_lc = alert_name.lower()
+                            for term, action in NODE_ALERT_ACTIONS.items():
+                                if term in alert_name_lc:
+                                    print(f"    Recommended action: {action}")
+                                    break
                 
                 # Display container memory alerts
                 if container_memory_alerts:
                     print("\n  Container Memory Alerts:")
                     for i, alert in enumerate(container_memory_alerts):
-                        alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                        severity = alert.get('labels', {}).get('severity', 'unknown')
+                        labels = alert.get('labels', {})
+                        alert_name = labels.get('alertname', 'Unknown')
+                        severity = labels.get('severity', 'unknown')
                         state = alert.get('state', 'unknown')
                         
                         # Get container information
-                        container_name = alert.get('labels', {}).get('name', 
-                                         alert.get('labels', {}).get('container_name', 'unknown'))
+                        container_name = labels.get('name', labels.get('container_name', 'unknown'))
                         
                         summary = alert.get('annotations', {}).get('summary', 'No summary available')
                         
@@ -294,15 +338,20 @@ def test_prometheus(prometheus_url=None, quiet=False):
                             print("\n  Current Container Memory Usage:")
                             
                             query = 'container_memory_usage_bytes{container_name!=""}'
-                            mem_usage_result = mcp.prometheus_query(query)
+                            mem_usage_result = cached_prometheus_query(mcp, query)
                             
                             query_limit = 'container_spec_memory_limit_bytes{container_name!=""}'
-                            mem_limit_result = mcp.prometheus_query(query_limit)
+                            mem_limit_result = cached_prometheus_query(mcp, query_limit)
                             
                             usage_data = mem_usage_result.get('data', {}).get('result', [])
                             limit_data = mem_limit_result.get('data', {}).get('result', [])
                             
                             if usage_data and limit_data:
+                                # Index limits by container, keeping the first series for each name
+                                limit_by_container = {}
+                                for r in limit_data:
+                                    limit_by_container.setdefault(r.get('metric', {}).get('container_name'), r)
+                                
                                 for result in usage_data:
                                     container = result.get('metric', {}).get('container_name', 'unknown')
                                     
@@ -313,22 +362,19 @@ def test_prometheus(prometheus_url=None, quiet=False):
                                     try:
                                         # Get memory usage in bytes
                                         memory_bytes = float(result.get('value', [0, 0])[1])
-                                        memory_mb = memory_bytes / (1024 * 1024)
+                                        memory_mb = memory_bytes * INV_MB
                                         
                                         # Find memory limit for this container
-                                        memory_limit_bytes = next(
-                                            (float(r.get('value', [0, 0])[1]) 
-                                             for r in limit_data 
-                                             if r.get('metric', {}).get('container_name') == container),
-                                            float('inf')
-                                        )
+                                        limit = limit_by_container.get(container)
+                                        memory_limit_bytes = (float(limit.get('value', [0, 0])[1]) 
+                                                              if limit is not None else float('inf'))
                                         
                                         # Handle unlimited containers
                                         if memory_limit_bytes == float('inf') or memory_limit_bytes == 0:
                                             print(f"    Container '{container}': {memory_mb:.2f} MB (no limit set)")
                                             continue
                                             
-                                        memory_limit_mb = memory_limit_bytes / (1024 * 1024)
+                                        memory_limit_mb = memory_limit_bytes * INV_MB
                                         usage_percent = (memory_bytes / memory_limit_bytes) * 100
                                         
                                         # Determine status
@@ -390,9 +436,9 @@ def test_prometheus(prometheus_url=None, quiet=False):
     print("\n4. Memory health report:")
     try:
         # Query current memory metrics
-        mem_total_result = mcp.prometheus_query("node_memory_MemTotal_bytes")
-        mem_available_result = mcp.prometheus_query("node_memory_MemAvailable_bytes")
-        mem_usage_pct_result = mcp.prometheus_query("(1 - node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes) * 100")
+        mem_total_result = mem_total_future.result()
+        mem_available_result = mem_available_future.result()
+        mem_usage_pct_result = mem_usage_pct_future.result()
         
         # Check results and generate report
         mem_total_data = mem_total_result.get('data', {}).get('result', [])
@@ -402,6 +448,14 @@ def test_prometheus(prometheus_url=None, quiet=False):
         if mem_total_data and mem_available_data and mem_usage_pct_data:
             print("  Memory Health Report (actual data):")
             
+            # Index total and available memory by instance, keeping the first series for each
+            mem_total_by_instance = {}
+            for r in mem_total_data:
+                mem_total_by_instance.setdefault(r.get('metric', {}).get('instance'), r)
+            mem_available_by_instance = {}
+            for r in mem_available_data:
+                mem_available_by_instance.setdefault(r.get('metric', {}).get('instance'), r)
+            
             # Process each host
             for i, result in enumerate(mem_usage_pct_data[:3]):
                 instance = result.get('metric', {}).get('instance', f'host-{i+1}')
@@ -411,22 +465,16 @@ def test_prometheus(prometheus_url=None, quiet=False):
                     mem_usage_pct = float(result.get('value', [0, 0])[1])
                     
                     # Find corresponding total memory value
-                    mem_total = next(
-                        (float(r.get('value', [0, 0])[1]) for r in mem_total_data 
-                         if r.get('metric', {}).get('instance') == instance),
-                        0
-                    )
+                    total = mem_total_by_instance.get(instance)
+                    mem_total = float(total.get('value', [0, 0])[1]) if total is not None else 0
                     
                     # Find corresponding available memory value
-                    mem_available = next(
-                        (float(r.get('value', [0, 0])[1]) for r in mem_available_data 
-                         if r.get('metric', {}).get('instance') == instance),
-                        0
-                    )
+                    available = mem_available_by_instance.get(instance)
+                    mem_available = float(available.get('value', [0, 0])[1]) if available is not None else 0
                     
                     # Convert to GB for readability
-                    mem_total_gb = mem_total / (1024 * 1024 * 1024)
-                    mem_available_gb = mem_available / (1024 * 1024 * 1024)
+                    mem_total_gb = mem_total * INV_GB
+                    mem_available_gb = mem_available * INV_GB
                     mem_used_gb = mem_total_gb - mem_available_gb
                     
                     print(f"\n  Host: {instance}")
@@ -593,10 +641,11 @@ def get_ai_recommendations(mcp, node_alerts, container_alerts):
         if node_alerts:
             node_alert_text = "Host Memory Alerts:\n"
             for i, alert in enumerate(node_alerts):
-                alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                severity = alert.get('labels', {}).get('severity', 'unknown')
+                labels = alert.get('labels', {})
+                alert_name = labels.get('alertname', 'Unknown')
+                severity = labels.get('severity', 'unknown')
                 state = alert.get('state', 'unknown')
-                instance = alert.get('labels', {}).get('instance', 'unknown')
+                instance = labels.get('instance', 'unknown')
                 summary = alert.get('annotations', {}).get('summary', 'No summary available')
                 
                 node_alert_text += f"- Alert {i+1}: {alert_name}\n"
@@ -609,11 +658,11 @@ def get_ai_recommendations(mcp, node_alerts, container_alerts):
         if container_alerts:
             container_alert_text = "Container Memory Alerts:\n"
             for i, alert in enumerate(container_alerts):
-                alert_name = alert.get('labels', {}).get('alertname', 'Unknown')
-                severity = alert.get('labels', {}).get('severity', 'unknown')
+                labels = alert.get('labels', {})
+                alert_name = labels.get('alertname', 'Unknown')
+                severity = labels.get('severity', 'unknown')
                 state = alert.get('state', 'unknown')
-                container_name = alert.get('labels', {}).get('name', 
-                                alert.get('labels', {}).get('container_name', 'unknown'))
+                container_name = labels.get('name', labels.get('container_name', 'unknown'))
                 summary = alert.get('annotations', {}).get('summary', 'No summary available')
                 
                 container_alert_text += f"- Alert {i+1}: {alert_name}\n"
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Add scripts directory to path to import the git diff script
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from test_git_diff import numstat_paths
+
+class TestNumstatPaths:
+    """Tests for splitting git diff --numstat paths"""
+    
+    @pytest.mark.parametrize("path, expected", [
+        ("requirements.txt", ["requirements.txt"]),
+        ("old.txt => new.txt", ["old.txt", "new.txt"]),
+        ("dir/{old => new}/file", ["dir/old/file", "dir/new/file"]),
+        ("{old.txt => new.txt}", ["old.txt", "new.txt"]),
+        ("dir/{ => sub}/file", ["dir/file", "dir/sub/file"]),
+        ("dir/{sub => }/file", ["dir/sub/file", "dir/file"]),
+        ("{d => s/d}/f", ["d/f", "s/d/f"]),
+        ("{ => sub}/file", ["file", "sub/file"]),
+        ("{sub => }/file", ["sub/file", "file"]),
+    ])
+    def test_numstat_paths(self, path, expected):
+        """Test that both sides of a rename are reported as repository-relative paths"""
+        assert numstat_paths(path) == expected